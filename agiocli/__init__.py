@@ -1,4 +1,7 @@
 """Autograder.io CLI API."""
 
-from .api_client import APIClient, TokenFileNotFound
+from .api_client import (
+    APIClient, AsyncAPIClient, TokenFileNotFound,
+    APIError, HTTPError, ContentTypeError, DecodeError,
+)
 from .utils import *
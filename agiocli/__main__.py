@@ -3,31 +3,96 @@ A command line interface to autograder.io.
 
 Andrew DeOrio <awdeorio@umich.edu>
 """
+import pathlib
 import sys
 import click
-from agiocli import APIClient, TokenFileNotFound, utils
+from agiocli import APIClient, APIError, TokenFileNotFound, profiling, utils
+from agiocli.api_client import POOL_MAXSIZE
+from agiocli.cache import Cache
+from agiocli.trace import Tracer
 
 
-@click.group(context_settings={"help_option_names": ["-h", "--help"]})
+class MainGroup(click.Group):
+    """Command group that turns uncaught API errors into exit messages."""
+
+    def invoke(self, ctx):
+        """Invoke the subcommand, exit with a message on an APIError."""
+        try:
+            return super().invoke(ctx)
+        except APIError as err:
+            sys.exit(f"Error: {err}")
+
+
+@click.group(
+    cls=MainGroup,
+    context_settings={"help_option_names": ["-h", "--help"]},
+)
 @click.version_option()
 @click.option("-d", "--debug", is_flag=True, help="Debug output")
+@click.option("--no-cache", is_flag=True,
+              help="Don't read or write the local response cache.")
+@click.option("--refresh", is_flag=True,
+              help="Ignore cached responses, but save fresh ones.")
+@click.option("--trace", "trace_path", type=click.Path(dir_okay=False),
+              help="Save a Chrome trace-event file of requests and lookups.")
+@click.option("--profile", "profile_mode", type=click.Choice(["cpu", "alloc"]),
+              help="Profile CPU time or memory allocations.")
+@click.option("--profile-output", type=click.Path(dir_okay=False),
+              help="Profile output file, default agio.prof or agio-alloc.txt.")
 @click.pass_context
-def main(ctx, debug):
+def main(ctx, debug, no_cache, refresh, trace_path, profile_mode,
+         profile_output):
     """Autograder.io command line interface."""
+    # pylint: disable=too-many-arguments
     # Pass global flags to subcommands via Click context
     # https://click.palletsprojects.com/en/latest/commands/#nested-handling-and-contexts
     ctx.ensure_object(dict)
     ctx.obj["DEBUG"] = debug
+    ctx.obj["CACHE"] = not no_cache
+    ctx.obj["REFRESH"] = refresh
+    ctx.obj["TRACER"] = None
+
+    # Save the trace after the subcommand span ends, even if it fails
+    if trace_path:
+        tracer = Tracer()
+        ctx.obj["TRACER"] = tracer
+        ctx.call_on_close(lambda: tracer.save(trace_path))
+        ctx.with_resource(tracer.span(
+            f"agio {ctx.invoked_subcommand}", "command",
+            argv=sys.argv[1:],
+        ))
+
+    # Profile the subcommand, the report is saved when it exits
+    if profile_mode:
+        ctx.with_resource(profiling.profile(profile_mode, profile_output))
+
+
+def make_client(ctx, pool_maxsize=POOL_MAXSIZE):
+    """Return an APIClient configured by global flags, or exit.
+
+    The connection pool holds at least pool_maxsize connections.  The client
+    raises APIError, which MainGroup translates to an exit message.
+    """
+    response_cache = None
+    if ctx.obj["CACHE"]:
+        response_cache = Cache.make_default(refresh=ctx.obj["REFRESH"])
+    try:
+        return APIClient.make_default(
+            debug=ctx.obj["DEBUG"],
+            cache=response_cache,
+            pool_maxsize=max(pool_maxsize, POOL_MAXSIZE),
+            raise_errors=True,
+            tracer=ctx.obj["TRACER"],
+        )
+    except TokenFileNotFound as err:
+        sys.exit(err)
 
 
 @main.command()
 @click.pass_context
 def login(ctx):
     """Show current authenticated user."""
-    try:
-        client = APIClient.make_default(debug=ctx.obj["DEBUG"])
-    except TokenFileNotFound as err:
-        sys.exit(err)
+    client = make_client(ctx)
     user = client.get("/api/users/current/")
     print(f"{user['username']} {user['first_name']} {user['last_name']}")
 
@@ -55,10 +120,7 @@ def courses(ctx, course_arg, show_list, web):  # noqa: D301
     agio courses eecs485[cur|current]
 
     """
-    try:
-        client = APIClient.make_default(debug=ctx.obj["DEBUG"])
-    except TokenFileNotFound as err:
-        sys.exit(err)
+    client = make_client(ctx)
 
     # Handle --list: list courses and exit
     if show_list:
@@ -104,14 +166,13 @@ def projects(ctx, project_arg, course_arg, show_list, web, config):  # noqa: D30
 
     """
     # pylint: disable=too-many-arguments
-    try:
-        client = APIClient.make_default(debug=ctx.obj["DEBUG"])
-    except TokenFileNotFound as err:
-        sys.exit(err)
+    client = make_client(ctx)
 
     # Handle --list: list projects and exit
     if show_list:
-        course = utils.get_course_smart(course_arg, client)
+        course = utils.get_course_smart(
+            course_arg, client, prefetch=utils.get_course_project_list
+        )
         project_list = utils.get_course_project_list(course, client)
         for i in project_list:
             print(utils.project_str(i))
@@ -148,15 +209,21 @@ def projects(ctx, project_arg, course_arg, show_list, web, config):  # noqa: D30
 @click.option("-j", "--list-json", "list_json", is_flag=True,
               help="List groups in JSON format (2D array) and exit.")
 @click.option("-w", "--web", is_flag=True, help="Open group in browser.")
+@click.option("--lookup", "lookup_file", type=click.File("r"),
+              help="Find the group of each uniqname in a file, - for stdin.")
 @click.pass_context
 # The \b character in the docstring prevents Click from rewraping a paragraph.
 # We need to tell pycodestyle to ignore it.
 # https://click.palletsprojects.com/en/8.0.x/documentation/#preventing-rewrapping
-def groups(ctx, group_arg, project_arg, course_arg, show_list, list_json, web):  # noqa: D301
+def groups(ctx, group_arg, project_arg, course_arg, show_list, list_json, web,
+           lookup_file):  # noqa: D301
     """Show group detail or list groups.
 
     GROUP_ARG is a primary key, name, or member uniqname.
 
+    With --lookup, read one uniqname per line and print each with its group.
+    Uniqnames in no group or in more than one group are reported at the end.
+
     \b
     EXAMPLES:
     agio groups --list
@@ -166,19 +233,19 @@ def groups(ctx, group_arg, project_arg, course_arg, show_list, list_json, web):
     agio groups awdeorio
     agio groups awdeorio --project 1005
     agio groups awdeorio --course eecs485sp21 --project p1
+    agio groups --lookup roster.txt --project p1
 
     """
     # We must have an function argument for each CLI argument or option
     # pylint: disable=too-many-arguments
 
-    try:
-        client = APIClient.make_default(debug=ctx.obj["DEBUG"])
-    except TokenFileNotFound as err:
-        sys.exit(err)
+    client = make_client(ctx)
 
     # Handle --list: list groups and exit
     if show_list:
-        project = utils.get_project_smart(project_arg, course_arg, client)
+        project = utils.get_project_smart(
+            project_arg, course_arg, client, prefetch=utils.get_group_list
+        )
         group_list = utils.get_group_list(project, client)
         for i in group_list:
             print(utils.group_str(i))
@@ -186,12 +253,22 @@ def groups(ctx, group_arg, project_arg, course_arg, show_list, list_json, web):
 
     # Handle --queue: list groups in OH Queue format and exit
     if list_json:
-        project = utils.get_project_smart(project_arg, course_arg, client)
+        project = utils.get_project_smart(
+            project_arg, course_arg, client, prefetch=utils.get_group_list
+        )
         group_list = utils.get_group_list(project, client)
         output = [utils.group_emails(group) for group in group_list]
         print(utils.dict_str(output))
         return
 
+    # Handle --lookup: resolve a roster of uniqnames and exit
+    if lookup_file:
+        project = utils.get_project_smart(
+            project_arg, course_arg, client, prefetch=utils.get_group_list
+        )
+        utils.lookup_groups(lookup_file, project, client)
+        return
+
     # Select a group and print or open it
     group = utils.get_group_smart(group_arg, project_arg, course_arg, client)
     if web:
@@ -217,12 +294,18 @@ def groups(ctx, group_arg, project_arg, course_arg, show_list, list_json, web):
               help="List groups and exit.")
 @click.option("-d", "--download", is_flag=True,
               help="Download submission files.")
+@click.option("--download-all", is_flag=True,
+              help="Download every group's final graded submission.")
+@click.option("-j", "--jobs", default=1, show_default=True,
+              type=click.IntRange(min=1),
+              help="Number of downloads to run in parallel.")
 @click.pass_context
 # The \b character in the docstring prevents Click from rewraping a paragraph.
 # We need to tell pycodestyle to ignore it.
 # https://click.palletsprojects.com/en/8.0.x/documentation/#preventing-rewrapping
 def submissions(ctx, submission_arg, group_arg,
-                project_arg, course_arg, show_list, download):  # noqa: D301
+                project_arg, course_arg, show_list, download,
+                download_all, jobs):  # noqa: D301
     """Show submission detail or list submissions.
 
     SUBMISSION_ARG is a primary key, 'best', or 'last'
@@ -236,14 +319,21 @@ def submissions(ctx, submission_arg, group_arg,
     agio submissions [...] best
     agio submissions [...] last
     agio submissions [...] --download
+    agio submissions [...] --download --jobs 4
+    agio submissions --course eecs485sp21 --project p1 --download-all
     """
     # We must have an function argument for each CLI argument or option
     # pylint: disable=too-many-arguments
 
-    try:
-        client = APIClient.make_default(debug=ctx.obj["DEBUG"])
-    except TokenFileNotFound as err:
-        sys.exit(err)
+    client = make_client(ctx, pool_maxsize=jobs)
+
+    # Handle --download-all: download all groups' submissions and exit
+    if download_all:
+        project = utils.get_project_smart(
+            project_arg, course_arg, client, prefetch=utils.get_group_list
+        )
+        utils.download_all_submissions(project, client, jobs)
+        return
 
     # Handle --list: list submissions and exit
     if show_list:
@@ -262,13 +352,116 @@ def submissions(ctx, submission_arg, group_arg,
 
     # Handle --download: download the submission and exit
     if download:
-        utils.download_submission(submission, group_arg, client)
+        utils.download_submission(submission, group_arg, client, jobs)
         return
 
     # Default: print submission
     print(utils.dict_str(submission))
 
 
+@main.command()
+@click.argument(
+    "dest", type=click.Path(file_okay=False, path_type=pathlib.Path)
+)
+@click.option("-c", "--course", "course_arg",
+              help="Course pk, name, or shorthand.")
+@click.option("-p", "--project", "project_arg",
+              help="Project pk, name, or shorthand.")
+@click.option("-j", "--jobs", default=1, show_default=True,
+              type=click.IntRange(min=1),
+              help="Number of groups to sync in parallel.")
+@click.pass_context
+# The \b character in the docstring prevents Click from rewraping a paragraph.
+# We need to tell pycodestyle to ignore it.
+# https://click.palletsprojects.com/en/8.0.x/documentation/#preventing-rewrapping
+def sync(ctx, dest, project_arg, course_arg, jobs):  # noqa: D301
+    """Mirror all submissions for a project into directory DEST.
+
+    Only submissions that are new since the last sync are downloaded.
+
+    \b
+    EXAMPLES:
+    agio sync --project 1005 backup/
+    agio sync --course eecs485sp21 --project p1 --jobs 8 backup/
+
+    """
+    # We must have an function argument for each CLI argument or option
+    # pylint: disable=too-many-arguments
+    client = make_client(ctx, pool_maxsize=jobs)
+    project = utils.get_project_smart(
+        project_arg, course_arg, client, prefetch=utils.get_group_list
+    )
+    utils.sync_submissions(project, dest, client, jobs)
+
+
+@main.group()
+def cache():
+    """Manage the local response cache."""
+
+
+@cache.command()
+def clear():
+    """Delete all cached responses and aliases."""
+    num_entries = Cache.make_default().clear()
+    print(f"Deleted {num_entries} cached responses")
+
+
+@cache.command()
+def stats():
+    """Show cache location, entry counts and size."""
+    cache_stats = Cache.make_default().stats()
+    print(f"Path: {cache_stats['path']}")
+    print(
+        f"Entries: {cache_stats['entries']} "
+        f"({cache_stats['fresh']} fresh, {cache_stats['stale']} stale)"
+    )
+    print(f"Size: {cache_stats['bytes']} bytes")
+    print(f"Aliases: {cache_stats['aliases']}")
+
+
+@cache.command()
+@click.option("-c", "--course", "course_arg", required=True,
+              help="Course pk, name, or shorthand.")
+@click.option("-p", "--project", "project_arg",
+              help="Project pk, name, or shorthand, default all projects.")
+@click.option("-s", "--submissions", "with_submissions", is_flag=True,
+              help="Also cache each group's submission list.")
+@click.option("-j", "--jobs", default=4, show_default=True,
+              type=click.IntRange(min=1),
+              help="Number of requests to run in parallel.")
+@click.option("--hours", default=utils.WARM_TTL_SECONDS / 3600,
+              show_default=True,
+              type=click.FloatRange(min=0, min_open=True),
+              help="Keep warmed responses in the cache this long.")
+@click.pass_context
+# The \b character in the docstring prevents Click from rewraping a paragraph.
+# We need to tell pycodestyle to ignore it.
+# https://click.palletsprojects.com/en/8.0.x/documentation/#preventing-rewrapping
+def warm(ctx, course_arg, project_arg, with_submissions, jobs,
+         hours):  # noqa: D301
+    """Fetch a course's projects and groups into the cache.
+
+    \b
+    EXAMPLES:
+    agio cache warm --course eecs485sp21
+    agio cache warm --course eecs485sp21 --project p1 --submissions
+    """
+    # pylint: disable=too-many-arguments
+    if not ctx.obj["CACHE"]:
+        sys.exit("Error: there is no cache to warm with --no-cache")
+    client = make_client(ctx, pool_maxsize=jobs)
+    course = utils.get_course_smart(course_arg, client)
+    project_list = None
+    if project_arg:
+        project_list = [
+            utils.get_project_smart(project_arg, str(course["pk"]), client)
+        ]
+    utils.warm_cache(
+        course, client, project_list, with_submissions, jobs,
+        ttl=hours*60*60,
+    )
+
+
 if __name__ == "__main__":
     # These errors are endemic to click
     # pylint: disable=no-value-for-parameter,unexpected-keyword-arg
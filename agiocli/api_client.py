@@ -3,14 +3,53 @@ Autograder REST API client, a wrapper around the requests library.
 
 Based on HTTPClient by James Perretta
 https://github.com/eecs-autograder/autograder-contrib/
+
+The requests and asyncio libraries are imported on first use, so that
+commands that never make a request, like agio --help, start quickly.
 """
+import collections
+import contextlib
 import copy
+import functools
+import itertools
+import math
 import os
 import json
+import pathlib
+import queue
 import sys
+import tempfile
+import threading
+import time
 from typing import Iterator
-from urllib.parse import urljoin
-import requests
+from urllib.parse import parse_qs, urlencode, urljoin, urlsplit, urlunsplit
+from agiocli import rate_limit, trace
+
+
+# Some imports are deferred to the functions that use them
+# pylint: disable=import-outside-toplevel
+
+
+# Default number of pooled connections kept open to each host
+POOL_MAXSIZE = 10
+
+# Default number of requests an AsyncAPIClient keeps in flight
+CONCURRENCY = 10
+
+# Default number of pages get_paginated fetches ahead of the caller
+PREFETCH_PAGES = 4
+
+# Default number of bytes download() reads into memory at a time
+CHUNK_SIZE = 64 * 1024
+
+# Default number of times to retry an idempotent request
+MAX_RETRIES = 5
+
+# Retry idempotent requests that fail with these status codes.  Slow down
+# all requests after a throttling status code.
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+RETRY_STATUS_CODES = {429, 502, 503, 504}
+THROTTLE_STATUS_CODES = {429, 503}
 
 
 class APIClient:
@@ -21,16 +60,27 @@ class APIClient:
     accepted by the corresponding requests library methods.
     https://requests.readthedocs.io/
 
+    All requests share one requests.Session, so TCP and TLS connections to
+    the server are pooled and kept alive between calls.
+
     Avoid constructing an APIClient directly.  Instead, use
     APIClient.make_default().
 
     """
 
+    # pylint: disable=too-many-instance-attributes
+
     @staticmethod
     def make_default(
             token_filename='.agtoken',
             base_url='https://autograder.io/',
-            debug=False
+            debug=False,
+            pool_maxsize=POOL_MAXSIZE,
+            keep_alive=True,
+            cache=None,
+            max_retries=MAX_RETRIES,
+            raise_errors=False,
+            tracer=None,
     ):
         """Create an APIClient instance with API token found in token_filename.
 
@@ -44,103 +94,586 @@ class APIClient:
 
         base_url will be prepended to all URLs passed to the client's
         request methods and defaults to https://autograder.io/.
-        """
-        return APIClient(get_api_token(token_filename), base_url, debug)
 
-    def __init__(self, api_token, base_url, debug=False):
+        pool_maxsize is the number of connections kept open to each host.
+        Set keep_alive=False to close the connection after every request.
+
+        cache is an optional agiocli.cache.Cache.  JSON responses to GET
+        requests are read from and saved to the cache.
+
+        Idempotent requests that fail with a throttling or transient server
+        error are retried up to max_retries times.
+
+        A failed request exits with an error message.  With
+        raise_errors=True, it raises an APIError subclass instead, so that
+        callers can handle failures and carry on.
+
+        tracer is an optional agiocli.trace.Tracer that records a span for
+        every request.
+        """
+        # pylint: disable=too-many-arguments
+        return APIClient(
+            get_api_token(token_filename), base_url, debug,
+            pool_maxsize=pool_maxsize, keep_alive=keep_alive, cache=cache,
+            max_retries=max_retries, raise_errors=raise_errors,
+            tracer=tracer,
+        )
+
+    def __init__(
+            self, api_token, base_url, debug=False,
+            pool_maxsize=POOL_MAXSIZE, keep_alive=True, cache=None,
+            rate_limiter=None, max_retries=MAX_RETRIES, raise_errors=False,
+            tracer=None,
+    ):
         """Create an APIClient instance using a raw api_token.
 
         Most users should use HTTPClient.make_default() instead.
+
+        All requests, from any thread, pass through rate_limiter, which
+        defaults to a new agiocli.rate_limit.RateLimiter.
         """
+        # pylint: disable=too-many-arguments
         self.api_token = api_token
         self.base_url = base_url
         self.debug = debug
+        self.session = make_session(pool_maxsize, keep_alive)
+        self.cache = cache
+        self.rate_limiter = rate_limiter or rate_limit.RateLimiter()
+        self.max_retries = max_retries
+        self.raise_errors = raise_errors
+        self.tracer = tracer
+
+    def close(self):
+        """Close all pooled connections."""
+        self.session.close()
+
+    def __enter__(self):
+        """Use the client as a context manager that closes the session."""
+        return self
+
+    def __exit__(self, *exc_info):
+        """Close pooled connections on exit."""
+        self.close()
 
     def get(self, path, *args, **kwargs):
         """Call requests.get with authentication headers and base URL."""
-        return self.do_request(requests.get, path, *args, **kwargs)
+        return self.do_request("GET", path, *args, **kwargs)
 
-    def get_paginated(self, path, *args, **kwargs):
-        """Iterate over paginated list route, yielding one page at a time."""
-        page_url = path
+    def get_paginated(self, path, *args, prefetch=PREFETCH_PAGES, **kwargs):
+        """Iterate over paginated list route, yielding one item at a time.
+
+        While the caller consumes a page, up to prefetch following pages are
+        fetched in the background.  When the first page reports a total
+        count, the remaining pages are requested in parallel.  Otherwise, a
+        worker thread follows the next links ahead of the caller.  Items are
+        always yielded in order.  Use prefetch=0 to fetch one page at a time.
+        """
+        page = self.get(path, *args, **kwargs)
+        assert "results" in page
+        assert "next" in page
+        yield from page["results"]
+        if not page["next"]:
+            return
+
+        # Choose a pipeline for the remaining pages
+        page_urls = paginated_urls(page)
+        if not prefetch:
+            pages = self._get_pages(page["next"], args, kwargs)
+        elif page_urls:
+            pages = self._get_pages_parallel(
+                page_urls, prefetch, args, kwargs
+            )
+        else:
+            pages = self._get_pages_read_ahead(
+                page["next"], prefetch, args, kwargs
+            )
+        for page in pages:
+            yield from page["results"]
+
+    def _get_pages(self, page_url, args, kwargs):
+        """Follow next links one page at a time."""
         while page_url:
-            response = self.get(page_url, *args, **kwargs)
-            response.raise_for_status()
-            assert "results" in response.json()
-            assert "next" in response.json()
-            for item in response.json()["results"]:
-                yield item
-            page_url = response.json()['next']
+            page = self.get(page_url, *args, **kwargs)
+            yield page
+            page_url = page["next"]
+
+    def _get_pages_parallel(self, page_urls, prefetch, args, kwargs):
+        """Fetch page_urls in parallel, at most prefetch at a time."""
+        import concurrent.futures
+        page_urls = iter(page_urls)
+        futures = collections.deque()
+        with concurrent.futures.ThreadPoolExecutor(prefetch) as executor:
+            try:
+                for page_url in itertools.islice(page_urls, prefetch):
+                    futures.append(
+                        executor.submit(self.get, page_url, *args, **kwargs)
+                    )
+                while futures:
+                    page = futures.popleft().result()
+
+                    # Keep the window full before handing the page over
+                    for page_url in itertools.islice(page_urls, 1):
+                        futures.append(executor.submit(
+                            self.get, page_url, *args, **kwargs
+                        ))
+                    yield page
+            finally:
+                for future in futures:
+                    future.cancel()
+
+    def _get_pages_read_ahead(self, page_url, prefetch, args, kwargs):
+        """Follow next links on a worker thread, up to prefetch pages ahead.
+
+        The worker puts pages on a bounded queue, followed by None when there
+        are no more pages.  An exception raised by the worker, including
+        SystemExit, is put on the queue and re-raised here.
+        """
+        pages = queue.Queue(maxsize=prefetch)
+        stop = threading.Event()
+
+        def put(item):
+            """Put item on the queue unless the consumer has stopped."""
+            while not stop.is_set():
+                try:
+                    pages.put(item, timeout=0.1)
+                    return
+                except queue.Full:
+                    continue
+
+        def worker():
+            """Fetch pages until the last page or the consumer stops."""
+            try:
+                for page in self._get_pages(page_url, args, kwargs):
+                    put(page)
+                    if stop.is_set():
+                        return
+                put(None)
+            except BaseException as err:  # pylint: disable=broad-except
+                put(err)
+
+        thread = threading.Thread(target=worker, daemon=True)
+        thread.start()
+        try:
+            while True:
+                page = pages.get()
+                if page is None:
+                    return
+                if isinstance(page, BaseException):
+                    raise page
+                yield page
+        finally:
+            stop.set()
 
     def post(self, path, *args, **kwargs):
         """Call requests.post with authentication headers and base URL."""
-        return self.do_request(requests.post, path, *args, **kwargs)
+        return self.do_request("POST", path, *args, **kwargs)
 
     def put(self, path, *args, **kwargs):
         """Call requests.put with authentication headers and base URL."""
-        return self.do_request(requests.put, path, *args, **kwargs)
+        return self.do_request("PUT", path, *args, **kwargs)
 
     def patch(self, path, *args, **kwargs):
         """Call requests.patch with authentication headers and base URL."""
-        return self.do_request(requests.patch, path, *args, **kwargs)
+        return self.do_request("PATCH", path, *args, **kwargs)
 
     def delete(self, path, *args, **kwargs):
         """Call requests.delete with authentication headers and base URL."""
-        return self.do_request(requests.delete, path, *args, **kwargs)
+        return self.do_request("DELETE", path, *args, **kwargs)
 
-    def do_request(self, method_func, path, *args, **kwargs):
+    def do_request(self, method, path, *args, refresh=False, ttl=None,
+                   raise_errors=None, **kwargs):
         """Add authentication, base URL, call method, parse JSON.
 
         - Append path to autograder REST API base URL
+        - Answer plain GET requests from the cache, if any, unless refresh
+          is set.  A fresh response is still saved to the cache, for ttl
+          seconds if set.
         - Add token authentication headers
-        - Call method_func
+        - Send the request with HTTP method using the pooled session
         - Check HTTP status code
         - Parse JSON
+
+        raise_errors overrides the client's setting for this request.
         """
         # Append path to base URL
         url = urljoin(self.base_url, path)
 
+        with self.error_mode(url, raise_errors), trace.span(
+                self.tracer, f"{method} {urlsplit(url).path}", "request",
+                method=method, url=url,
+        ) as span_args:
+            # Plain GET requests go through the cache
+            if (method == "GET" and self.cache is not None and
+                    not args and kwargs.keys() <= {"headers"}):
+                return self.do_cached_request(
+                    url, span_args, refresh=refresh, ttl=ttl, **kwargs
+                )
+
+            response = self.send(method, url, *args, **kwargs)
+            return decode_response(response)
+
+    @contextlib.contextmanager
+    def error_mode(self, url, raise_errors=None):
+        """Handle a failed request to url according to raise_errors.
+
+        A connection failure becomes an APIError.  An APIError is raised if
+        raise_errors is set, otherwise it exits with an error message.
+        raise_errors defaults to the client's setting.
+        """
+        if raise_errors is None:
+            raise_errors = self.raise_errors
+        import requests
+        try:
+            try:
+                yield
+            except requests.RequestException as err:
+                raise APIError(f"{err} for url {url}") from err
+        except APIError as err:
+            if raise_errors:
+                raise
+            sys.exit(f"Error: {err}")
+
+    def do_cached_request(self, url, span_args, headers=None, refresh=False,
+                          ttl=None):
+        """GET url from the cache, revalidating an expired entry if needed.
+
+        The outcome, "hit", "revalidated" or "miss", is saved to span_args.
+        With refresh=True, the cache is not read, but the response is saved.
+        ttl overrides the time to live of the saved response.
+        """
+        # pylint: disable=too-many-arguments
+        body = None if refresh else self.cache.get(self.api_token, url)
+        span_args["cache"] = "hit" if body is not None else "miss"
+        if body is not None:
+            if self.debug:
+                print(f"GET {url} (cached)")
+            return json.loads(body)
+
+        # Revalidate an expired entry with a conditional request
+        headers = copy.deepcopy(headers or {})
+        stale = None if refresh else self.cache.get_stale(self.api_token, url)
+        if stale:
+            _, etag, last_modified = stale
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+        response = self.send("GET", url, headers=headers)
+
+        # Serve the cached body if it's unchanged
+        if stale and response.status_code == 304:
+            body = stale[0]
+            self.cache.revalidate(self.api_token, url, body)
+            span_args["cache"] = "revalidated"
+            if self.debug:
+                print(
+                    f"304 Not Modified, saved {len(body.encode('utf-8'))} "
+                    f"bytes ({self.cache.bytes_saved} bytes in "
+                    f"{self.cache.revalidated} responses)"
+                )
+            return json.loads(body)
+
+        data = decode_response(response)
+        if not isinstance(data, bytes):
+            self.cache.put(
+                self.api_token, url, response.text,
+                etag=response.headers.get("ETag"),
+                last_modified=response.headers.get("Last-Modified"),
+                ttl=ttl,
+            )
+        return data
+
+    def send(self, method, url, *args, **kwargs):
+        """Send a request with authentication headers, return the response.
+
+        Requests wait for the rate limiter.  Idempotent requests are retried
+        with jittered exponential backoff after a connection error or a
+        retryable status code, honoring Retry-After.
+        """
         # Print request method and url
         if self.debug:
-            method = method_func.__name__.upper()
             print(f"{method} {url}")
 
         # Call the underlying requests library function
         headers = copy.deepcopy(kwargs.pop('headers', {}))
         headers['Authorization'] = f'Token {self.api_token}'
-        response = method_func(url, *args, headers=headers, **kwargs)
+        import requests
+        retry = method in IDEMPOTENT_METHODS
+        for attempt in itertools.count():
+            start = time.perf_counter()
+            self.rate_limiter.acquire()
+            try:
+                with trace.span(self.tracer, "HTTP", "http",
+                                attempt=attempt) as span_args:
+                    span_args["rate_limit_wait_ms"] = \
+                        (time.perf_counter() - start) * 1000
+                    response = self.session.request(
+                        method, url, *args, headers=headers, **kwargs
+                    )
+                    span_args.update(response_span_args(
+                        response, stream=kwargs.get("stream", False)
+                    ))
+            except requests.ConnectionError:
+                if not retry or attempt >= self.max_retries:
+                    raise
+                time.sleep(rate_limit.backoff_delay(attempt))
+                continue
+
+            # Adjust the request rate
+            retry_after = rate_limit.parse_retry_after(
+                response.headers.get("Retry-After")
+            )
+            if response.status_code in THROTTLE_STATUS_CODES:
+                self.rate_limiter.throttle(retry_after)
+            elif response.status_code < 400:
+                self.rate_limiter.success()
+
+            # Retry, or give up and return the error response
+            if (not retry or attempt >= self.max_retries or
+                    response.status_code not in RETRY_STATUS_CODES):
+                break
+            if self.debug:
+                print(
+                    f"{response.status_code} {response.reason}, "
+                    f"retry {attempt + 1}"
+                )
+            response.close()
 
-        # Print the response
-        if self.debug:
+            # After a throttling Retry-After, the rate limiter pauses every
+            # request.  Any other Retry-After delays only this request.
+            if retry_after is None:
+                time.sleep(rate_limit.backoff_delay(attempt))
+            elif response.status_code not in THROTTLE_STATUS_CODES:
+                time.sleep(retry_after)
+
+        # Print the response, unless the caller will stream the body
+        if self.debug and not kwargs.get("stream"):
             print_response(response)
+        return response
 
-        # Check response status code
-        if not response.ok:
-            sys.exit(
-                f"Error: {response.status_code} {response.reason} "
-                f"for url {response.url}"
-            )
+    def download(self, path, target, chunk_size=CHUNK_SIZE, digest=None):
+        """Stream the response body from path to file target.
 
-        # Decode JSON
-        if "Content-Type" not in response.headers:
-            sys.exit(f"Error: no Content-Type from: {response.url}")
-        if 'application/json' in response.headers['Content-Type']:
-            try:
-                return response.json()
-            except json.JSONDecodeError:
-                sys.exit(
-                    f"Error: JSON decoding failed for url {response.url}\n"
-                    f"{response.text}"
-                )
-        elif 'application/octet-stream' in response.headers['Content-Type']:
-            return response.content
-        else:
-            sys.exit(
-                "Error: Unknown Content-Type "
-                f"'{response.headers['Content-Type']}' for url {response.url}"
+        The body is written chunk_size bytes at a time to a temporary file in
+        the same directory, which is atomically renamed to target once the
+        download completes.  Memory use does not depend on the file size, and
+        an interrupted download never leaves a partial target behind.
+
+        digest is an optional hashlib object, updated with each chunk.
+
+        Return the number of bytes written.
+        """
+        target = pathlib.Path(target)
+        url = urljoin(self.base_url, path)
+        with self.error_mode(url), trace.span(
+                self.tracer, f"download {urlsplit(url).path}", "request",
+                url=url, target=str(target),
+        ) as span_args, self.send("GET", url, stream=True) as response:
+            check_status(response)
+            with tempfile.NamedTemporaryFile(
+                    dir=target.parent,
+                    prefix=f".{target.name}.",
+                    suffix=".part",
+                    delete=False,
+            ) as tmpfile:
+                try:
+                    size = 0
+                    for chunk in response.iter_content(chunk_size):
+                        tmpfile.write(chunk)
+                        size += len(chunk)
+                        if digest is not None:
+                            digest.update(chunk)
+                except BaseException:
+                    tmpfile.close()
+                    os.unlink(tmpfile.name)
+                    raise
+            os.replace(tmpfile.name, target)
+            span_args["bytes"] = size
+        return size
+
+
+class AsyncAPIClient:
+    """Send authenticated requests to the autograder.io REST API from asyncio.
+
+    AsyncAPIClient has the same path, base_url and token semantics as
+    APIClient, and decodes responses identically.  Coroutines may be run
+    concurrently, for example with asyncio.gather(), and at most concurrency
+    requests are in flight at once.  Each request is sent by a pooled
+    APIClient on a worker thread, so the event loop is never blocked.
+
+    Avoid constructing an AsyncAPIClient directly.  Instead, use
+    AsyncAPIClient.make_default().
+
+    """
+
+    @staticmethod
+    def make_default(
+            token_filename='.agtoken',
+            base_url='https://autograder.io/',
+            debug=False,
+            concurrency=CONCURRENCY,
+            raise_errors=False,
+    ):
+        """Create an AsyncAPIClient with API token found in token_filename.
+
+        Token file discovery and raise_errors are the same as
+        APIClient.make_default().
+        """
+        return AsyncAPIClient(
+            get_api_token(token_filename), base_url, debug, concurrency,
+            raise_errors,
+        )
+
+    def __init__(self, api_token, base_url, debug=False,
+                 concurrency=CONCURRENCY, raise_errors=False):
+        """Create an AsyncAPIClient instance using a raw api_token."""
+        # pylint: disable=too-many-arguments
+        self.client = APIClient(
+            api_token, base_url, debug, pool_maxsize=concurrency,
+            raise_errors=raise_errors,
+        )
+        self.concurrency = concurrency
+        import concurrent.futures
+        self.executor = concurrent.futures.ThreadPoolExecutor(concurrency)
+
+        # The semaphore is created on first use so that it belongs to the
+        # running event loop
+        self._semaphore = None
+
+    async def close(self):
+        """Stop worker threads and close all pooled connections.
+
+        Waiting for the worker threads happens on another thread, so that
+        the event loop isn't blocked.
+        """
+        import asyncio
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.executor.shutdown)
+        self.client.close()
+
+    async def __aenter__(self):
+        """Use the client as an async context manager."""
+        return self
+
+    async def __aexit__(self, *exc_info):
+        """Close the client on exit."""
+        await self.close()
+
+    async def get(self, path, *args, **kwargs):
+        """Await a GET request with authentication headers and base URL."""
+        return await self.do_request("GET", path, *args, **kwargs)
+
+    async def get_paginated(self, path, *args, **kwargs):
+        """Iterate over paginated list route, yielding one item at a time."""
+        page_url = path
+        while page_url:
+            page = await self.get(page_url, *args, **kwargs)
+            assert "results" in page
+            assert "next" in page
+            for item in page["results"]:
+                yield item
+            page_url = page["next"]
+
+    async def post(self, path, *args, **kwargs):
+        """Await a POST request with authentication headers and base URL."""
+        return await self.do_request("POST", path, *args, **kwargs)
+
+    async def put(self, path, *args, **kwargs):
+        """Await a PUT request with authentication headers and base URL."""
+        return await self.do_request("PUT", path, *args, **kwargs)
+
+    async def patch(self, path, *args, **kwargs):
+        """Await a PATCH request with authentication headers and base URL."""
+        return await self.do_request("PATCH", path, *args, **kwargs)
+
+    async def delete(self, path, *args, **kwargs):
+        """Await a DELETE request with authentication headers and base URL."""
+        return await self.do_request("DELETE", path, *args, **kwargs)
+
+    async def do_request(self, method, path, *args, **kwargs):
+        """Wait for a free slot, then run APIClient.do_request on a worker."""
+        import asyncio
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        async with self._semaphore:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self.executor,
+                functools.partial(
+                    self.client.do_request, method, path, *args, **kwargs
+                ),
             )
 
 
+def make_session(pool_maxsize=POOL_MAXSIZE, keep_alive=True):
+    """Return a requests.Session with a connection pool of pool_maxsize.
+
+    With keep_alive=False, ask the server to close the connection after each
+    response, which disables connection reuse.
+
+    If AGIO_RECORD or AGIO_REPLAY is set, responses are recorded to or
+    replayed from a cassette, see agiocli.cassette.
+    """
+    import requests
+    import requests.adapters
+    from agiocli import cassette
+    session = requests.Session()
+    adapter = cassette.make_adapter(pool_maxsize)
+    if adapter is None:
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=pool_maxsize,
+            pool_maxsize=pool_maxsize,
+        )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    if not keep_alive:
+        session.headers["Connection"] = "close"
+    return session
+
+
+def response_span_args(response, stream=False):
+    """Return trace span arguments describing response.
+
+    The time to first byte is the time from sending the request until the
+    response headers were parsed.  A streamed body has not been read yet,
+    so its size is taken from the Content-Length header, if any.
+    """
+    if stream:
+        num_bytes = response.headers.get("Content-Length")
+    else:
+        num_bytes = len(response.content)
+    return {
+        "status": response.status_code,
+        "bytes": num_bytes,
+        "ttfb_ms": response.elapsed.total_seconds() * 1000,
+    }
+
+
+def paginated_urls(page):
+    """Return the URLs of all pages after page, or None if unknown.
+
+    Page URLs can be computed when the server reports a total count and the
+    next link uses a numeric 'page' query parameter, as with Django REST
+    framework's PageNumberPagination.
+    """
+    count = page.get("count")
+    if count is None or not page["results"] or not page["next"]:
+        return None
+    next_url = urlsplit(page["next"])
+    query = parse_qs(next_url.query)
+    if not query.get("page", [""])[0].isnumeric():
+        return None
+    next_num = int(query["page"][0])
+    num_pages = math.ceil(count / len(page["results"]))
+    urls = []
+    for num in range(next_num, num_pages + 1):
+        query["page"] = [str(num)]
+        urls.append(urlunsplit(
+            next_url._replace(query=urlencode(query, doseq=True))
+        ))
+    return urls
+
+
 def get_api_token(token_filename: str) -> str:
     """Search for autograder.io token.
 
@@ -187,6 +720,48 @@ def walk_up_to_home_dir() -> Iterator[str]:
     yield home_dir
 
 
+def check_status(response):
+    """Raise HTTPError if response has an error status code."""
+    if not response.ok:
+        raise HTTPError(
+            f"{response.status_code} {response.reason} "
+            f"for url {response.url}",
+            response,
+        )
+
+
+def decode_response(response):
+    """Check the status code of response and decode its body.
+
+    Return parsed JSON for application/json and bytes for
+    application/octet-stream.  Raise an APIError subclass otherwise.
+    """
+    check_status(response)
+
+    # Decode JSON
+    if "Content-Type" not in response.headers:
+        raise ContentTypeError(
+            f"no Content-Type from: {response.url}", response
+        )
+    if 'application/json' in response.headers['Content-Type']:
+        try:
+            return response.json()
+        except json.JSONDecodeError as err:
+            raise DecodeError(
+                f"JSON decoding failed for url {response.url}\n"
+                f"{response.text}",
+                response,
+            ) from err
+    elif 'application/octet-stream' in response.headers['Content-Type']:
+        return response.content
+    else:
+        raise ContentTypeError(
+            "Unknown Content-Type "
+            f"'{response.headers['Content-Type']}' for url {response.url}",
+            response,
+        )
+
+
 def print_response(response):
     """Print a response object."""
     try:
@@ -200,3 +775,33 @@ def print_response(response):
 
 class TokenFileNotFound(Exception):
     """Exception type indicating failure to locate user token file."""
+
+
+class APIError(Exception):
+    """Base exception type for a failed REST API request.
+
+    response is the requests.Response, or None if there was no response,
+    for example after a connection error.
+    """
+
+    def __init__(self, message, response=None):
+        """Create an APIError with a message and optional response."""
+        super().__init__(message)
+        self.response = response
+
+
+class HTTPError(APIError):
+    """Exception type indicating an error HTTP status code."""
+
+    @property
+    def status_code(self):
+        """Return the HTTP status code of the response."""
+        return self.response.status_code
+
+
+class ContentTypeError(APIError):
+    """Exception type indicating a missing or unknown Content-Type."""
+
+
+class DecodeError(APIError):
+    """Exception type indicating a response body that isn't valid JSON."""
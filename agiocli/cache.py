@@ -0,0 +1,271 @@
+"""Persistent on-disk cache of REST API responses, backed by SQLite."""
+import hashlib
+import os
+import pathlib
+import re
+import threading
+import time
+from urllib.parse import urlsplit
+
+
+# Seconds to keep a GET response, by URL path.  The first matching pattern
+# wins.  Responses for paths that match no pattern are never cached.
+TTL_SECONDS = [
+    (r"^/api/users/current/$", 24*60*60),
+    (r"^/api/users/\d+/courses_is_(admin|staff)_for/$", 60*60),
+    (r"^/api/courses/\d+/$", 60*60),
+    (r"^/api/courses/\d+/projects/$", 60*60),
+    (r"^/api/projects/\d+/$", 10*60),
+    (r"^/api/projects/\d+/groups/$", 10*60),
+    (r"^/api/groups/\d+/$", 10*60),
+    (r"^/api/groups/\d+/submissions/$", 60),
+]
+
+# Increment when the schema changes.  An old cache is discarded.
+SCHEMA_VERSION = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    token TEXT NOT NULL,
+    url TEXT NOT NULL,
+    body TEXT NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    fetched REAL NOT NULL,
+    expires REAL NOT NULL,
+    PRIMARY KEY (token, url)
+)
+"""
+
+ALIASES_SCHEMA = """
+CREATE TABLE IF NOT EXISTS aliases (
+    token TEXT NOT NULL,
+    scope TEXT NOT NULL,
+    shorthand TEXT NOT NULL,
+    pk INTEGER NOT NULL,
+    PRIMARY KEY (token, scope, shorthand)
+)
+"""
+
+
+def default_cache_dir():
+    """Return the cache directory.
+
+    Use $AGIO_CACHE_DIR if set, otherwise $XDG_CACHE_HOME/agio, otherwise
+    ~/.cache/agio.
+    """
+    if "AGIO_CACHE_DIR" in os.environ:
+        return pathlib.Path(os.environ["AGIO_CACHE_DIR"])
+    xdg_cache_home = os.environ.get("XDG_CACHE_HOME", "~/.cache")
+    return pathlib.Path(xdg_cache_home).expanduser()/"agio"
+
+
+def ttl_seconds(url):
+    """Return the time to live for a response from url, or None."""
+    url = urlsplit(url)
+    if url.query:
+        return None
+    for pattern, ttl in TTL_SECONDS:
+        if re.search(pattern, url.path):
+            return ttl
+    return None
+
+
+def token_key(api_token):
+    """Return a digest that identifies api_token without revealing it."""
+    return hashlib.sha256(str(api_token).encode("utf-8")).hexdigest()
+
+
+class Cache:
+    """Store decoded JSON responses in a SQLite database.
+
+    Entries are keyed by API token and URL, so users sharing a machine never
+    see each other's data.  With refresh=True, lookups always miss, but
+    fresh responses are still stored.
+
+    Expired entries are kept along with their ETag and Last-Modified
+    validators, so that a client can revalidate them with a conditional
+    request.  The revalidated and bytes_saved counters track responses
+    that were not downloaded again, and bytes_stored counts the bytes of
+    response bodies stored.
+
+    Aliases map a shorthand, like a course string, project string or
+    uniqname, to the primary key it resolved to.  The scope of an alias is
+    the URL of the list it was matched against.  Aliases are kept until
+    they are deleted, because the answer doesn't change.
+
+    A Cache may be shared by threads.
+
+    """
+
+    # pylint: disable=too-many-instance-attributes
+
+    @staticmethod
+    def make_default(refresh=False):
+        """Create a Cache in the default cache directory."""
+        cache_dir = default_cache_dir()
+        cache_dir.mkdir(mode=0o700, parents=True, exist_ok=True)
+        return Cache(cache_dir/"cache.sqlite3", refresh)
+
+    def __init__(self, path, refresh=False):
+        """Open or create the cache database at path."""
+        import sqlite3  # pylint: disable=import-outside-toplevel
+        self.path = pathlib.Path(path)
+        self.refresh = refresh
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self.bytes_saved = 0
+        self.bytes_stored = 0
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(
+            str(self.path), check_same_thread=False
+        )
+        with self.lock, self.connection:
+            version, = self.connection.execute(
+                "PRAGMA user_version"
+            ).fetchone()
+            if version != SCHEMA_VERSION:
+                self.connection.execute("DROP TABLE IF EXISTS responses")
+                self.connection.execute("DROP TABLE IF EXISTS aliases")
+                self.connection.execute(
+                    f"PRAGMA user_version = {SCHEMA_VERSION}"
+                )
+            self.connection.execute(SCHEMA)
+            self.connection.execute(ALIASES_SCHEMA)
+
+    def close(self):
+        """Close the database."""
+        self.connection.close()
+
+    def get(self, api_token, url):
+        """Return the cached response body for url, or None on a miss."""
+        if self.refresh:
+            self.misses += 1
+            return None
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT body FROM responses "
+                "WHERE token = ? AND url = ? AND expires > ?",
+                (token_key(api_token), url, time.time()),
+            ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return row[0]
+
+    def get_stale(self, api_token, url):
+        """Return (body, etag, last_modified) for url, or None.
+
+        Call after get() misses.  Only entries with at least one validator
+        are returned, even if they have expired.
+        """
+        if self.refresh:
+            return None
+        with self.lock:
+            return self.connection.execute(
+                "SELECT body, etag, last_modified FROM responses "
+                "WHERE token = ? AND url = ? "
+                "AND (etag IS NOT NULL OR last_modified IS NOT NULL)",
+                (token_key(api_token), url),
+            ).fetchone()
+
+    def put(self, api_token, url, body, etag=None, last_modified=None,
+            ttl=None):
+        """Store the response body for url if its path is cacheable.
+
+        ttl overrides the time to live for the path, in seconds.
+        """
+        # pylint: disable=too-many-arguments
+        if ttl_seconds(url) is None:
+            return
+        if ttl is None:
+            ttl = ttl_seconds(url)
+        now = time.time()
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(token, url, body, etag, last_modified, fetched, expires) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (token_key(api_token), url, body, etag, last_modified,
+                 now, now + ttl),
+            )
+            self.bytes_stored += len(body.encode("utf-8"))
+
+    def revalidate(self, api_token, url, body):
+        """Mark the entry for url fresh after a 304 Not Modified response."""
+        ttl = ttl_seconds(url)
+        if ttl is None:
+            return
+        now = time.time()
+        with self.lock, self.connection:
+            self.connection.execute(
+                "UPDATE responses SET fetched = ?, expires = ? "
+                "WHERE token = ? AND url = ?",
+                (now, now + ttl, token_key(api_token), url),
+            )
+            self.revalidated += 1
+            self.bytes_saved += len(body.encode("utf-8"))
+
+    def get_alias(self, api_token, scope, shorthand):
+        """Return the primary key saved for shorthand in scope, or None."""
+        if self.refresh:
+            return None
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT pk FROM aliases "
+                "WHERE token = ? AND scope = ? AND shorthand = ?",
+                (token_key(api_token), scope, shorthand),
+            ).fetchone()
+        return row[0] if row else None
+
+    def put_alias(self, api_token, scope, shorthand, pk):
+        """Save the primary key that shorthand resolved to in scope."""
+        # pylint: disable=invalid-name
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO aliases (token, scope, shorthand, pk) "
+                "VALUES (?, ?, ?, ?)",
+                (token_key(api_token), scope, shorthand, pk),
+            )
+
+    def delete_alias(self, api_token, scope, shorthand):
+        """Forget the primary key saved for shorthand in scope."""
+        with self.lock, self.connection:
+            self.connection.execute(
+                "DELETE FROM aliases "
+                "WHERE token = ? AND scope = ? AND shorthand = ?",
+                (token_key(api_token), scope, shorthand),
+            )
+
+    def clear(self):
+        """Delete all entries and aliases, return the number of entries."""
+        with self.lock, self.connection:
+            cursor = self.connection.execute("DELETE FROM responses")
+            self.connection.execute("DELETE FROM aliases")
+        with self.lock:
+            self.connection.execute("VACUUM")
+        return cursor.rowcount
+
+    def stats(self):
+        """Return a dictionary of entry counts and sizes."""
+        with self.lock:
+            num_entries, num_fresh, num_bytes = self.connection.execute(
+                "SELECT COUNT(*), "
+                "COALESCE(SUM(expires > ?), 0), "
+                "COALESCE(SUM(LENGTH(CAST(body AS BLOB))), 0) "
+                "FROM responses",
+                (time.time(),),
+            ).fetchone()
+            num_aliases, = self.connection.execute(
+                "SELECT COUNT(*) FROM aliases"
+            ).fetchone()
+        return {
+            "path": str(self.path),
+            "entries": num_entries,
+            "fresh": num_fresh,
+            "stale": num_entries - num_fresh,
+            "bytes": num_bytes,
+            "aliases": num_aliases,
+        }
@@ -0,0 +1,198 @@
+"""Record REST API responses to a cassette directory and replay them.
+
+Set AGIO_RECORD=DIR to save every response received by APIClient, or
+AGIO_REPLAY=DIR to answer requests from a saved cassette without a network.
+AGIO_REPLAY_LATENCY adds a delay in seconds to each replayed response.
+
+A cassette directory contains cassette.jsonl, with one line per response,
+and a bodies/ directory, with one file per distinct body named by its
+SHA-256 digest.  Request headers, including Authorization, are never saved.
+"""
+import collections
+import hashlib
+import io
+import json
+import os
+import pathlib
+import tempfile
+import threading
+import time
+import requests
+import requests.adapters
+import requests.structures
+import requests.utils
+
+
+# Response headers that describe the encoded body on the wire, not the
+# decoded body saved in a cassette
+WIRE_HEADERS = {"content-encoding", "content-length", "transfer-encoding"}
+
+
+class CassetteMiss(requests.RequestException):
+    """A replayed request has no recorded response."""
+
+
+def request_key(request):
+    """Return (method, url, body digest) identifying a prepared request."""
+    body = request.body
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    digest = hashlib.sha256(body).hexdigest() if body else None
+    return request.method, request.url, digest
+
+
+class Cassette:
+    """A directory of recorded responses.
+
+    A Cassette may be shared by threads.
+
+    """
+
+    def __init__(self, path):
+        """Open the cassette directory at path."""
+        self.path = pathlib.Path(path)
+        self.lock = threading.Lock()
+
+    @property
+    def index_path(self):
+        """Return the path of the response index."""
+        return self.path/"cassette.jsonl"
+
+    def body_path(self, digest):
+        """Return the path of the body file with SHA-256 digest."""
+        return self.path/"bodies"/digest
+
+    def save(self, request, response):
+        """Append response to request, with its body, to the cassette."""
+        body = response.content
+        digest = hashlib.sha256(body).hexdigest()
+        method, url, request_digest = request_key(request)
+        entry = {
+            "method": method,
+            "url": url,
+            "request_body": request_digest,
+            "status": response.status_code,
+            "reason": response.reason,
+            "headers": {
+                key: value for key, value in response.headers.items()
+                if key.lower() not in WIRE_HEADERS
+            },
+            "body": digest,
+        }
+        with self.lock:
+            body_path = self.body_path(digest)
+            if not body_path.exists():
+                body_path.parent.mkdir(parents=True, exist_ok=True)
+                with tempfile.NamedTemporaryFile(
+                        dir=body_path.parent, delete=False,
+                ) as tmpfile:
+                    tmpfile.write(body)
+                os.replace(tmpfile.name, body_path)
+            with self.index_path.open("a", encoding="utf-8") as outfile:
+                outfile.write(json.dumps(entry) + "\n")
+
+    def load(self):
+        """Return a dictionary mapping request keys to lists of entries."""
+        entries = collections.defaultdict(list)
+        with self.index_path.open(encoding="utf-8") as infile:
+            for line in infile:
+                entry = json.loads(line)
+                key = (entry["method"], entry["url"], entry["request_body"])
+                entries[key].append(entry)
+        return entries
+
+
+class RecordingAdapter(requests.adapters.HTTPAdapter):
+    """Send requests over the network and record every response."""
+
+    def __init__(self, cassette, **kwargs):
+        """Record to cassette, pass other arguments to HTTPAdapter."""
+        self.cassette = cassette
+        super().__init__(**kwargs)
+
+    def send(self, request, *args, **kwargs):
+        """Send request, save the response and return it.
+
+        A streamed body is read into memory so that it can be saved.
+        """
+        # pylint: disable=arguments-differ
+        response = super().send(request, *args, **kwargs)
+        self.cassette.save(request, response)
+        return response
+
+
+class ReplayAdapter(requests.adapters.BaseAdapter):
+    """Answer requests with responses from a cassette.
+
+    Responses to the same request are replayed in the order they were
+    recorded, and the last one is repeated after that.  latency is a delay
+    in seconds before each response.
+
+    """
+
+    def __init__(self, cassette, latency=0):
+        """Load all entries from cassette."""
+        super().__init__()
+        self.cassette = cassette
+        self.latency = latency
+        self.entries = cassette.load()
+        self.num_replayed = collections.Counter()
+        self.lock = threading.Lock()
+
+    def send(self, request, *args, **kwargs):
+        """Return the recorded response to request."""
+        # pylint: disable=arguments-differ,unused-argument
+        key = request_key(request)
+        with self.lock:
+            entries = self.entries.get(key)
+            if not entries:
+                raise CassetteMiss(
+                    f"No recorded response to {request.method} {request.url}",
+                    request=request,
+                )
+            index = min(self.num_replayed[key], len(entries) - 1)
+            self.num_replayed[key] += 1
+        entry = entries[index]
+        if self.latency:
+            time.sleep(self.latency)
+
+        body = self.cassette.body_path(entry["body"]).read_bytes()
+        response = requests.Response()
+        response.status_code = entry["status"]
+        response.reason = entry["reason"]
+        response.headers = requests.structures.CaseInsensitiveDict(
+            entry["headers"]
+        )
+        response.headers["Content-Length"] = str(len(body))
+        response.encoding = requests.utils.get_encoding_from_headers(
+            response.headers
+        )
+        response.raw = io.BytesIO(body)
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        return response
+
+    def close(self):
+        """Release nothing, there are no connections."""
+
+
+def make_adapter(pool_maxsize):
+    """Return a recording or replaying adapter configured by the environment.
+
+    Return None if neither AGIO_RECORD nor AGIO_REPLAY is set.
+    """
+    if os.environ.get("AGIO_REPLAY"):
+        return ReplayAdapter(
+            Cassette(os.environ["AGIO_REPLAY"]),
+            latency=float(os.environ.get("AGIO_REPLAY_LATENCY", 0)),
+        )
+    if os.environ.get("AGIO_RECORD"):
+        cassette = Cassette(os.environ["AGIO_RECORD"])
+        cassette.path.mkdir(parents=True, exist_ok=True)
+        return RecordingAdapter(
+            cassette,
+            pool_connections=pool_maxsize,
+            pool_maxsize=pool_maxsize,
+        )
+    return None
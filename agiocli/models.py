@@ -0,0 +1,164 @@
+"""Compact read-only records for REST API objects.
+
+A record stores the fields of a decoded JSON object from the API in slots,
+with no per-instance dict, and keeps the values that agio derives from them,
+like a parsed timestamp, computed once.  Records behave like the read-only
+dicts they were built from, so code that indexes API responses, like
+course["name"], works with either.  The dict is rebuilt on demand, for
+example to print a record as JSON.
+
+Each record type lists the JSON keys it expects in FIELDS.  Keys that are
+not listed, like fields added by a newer server, are kept in a small dict
+of extras.  The values themselves are shared with the decoded dict, so the
+saving is the dict's hash table: about 250 bytes per Submission, or a fifth
+of a typical submission with its values.
+"""
+import collections.abc
+import datetime as dt
+
+
+def parse_timestamp(timestamp):
+    """Return an aware datetime from an API timestamp string.
+
+    datetime.fromisoformat is much faster than dateutil, but it only
+    accepts a trailing Z and arbitrary fractional seconds starting with
+    Python 3.11.  Fall back to dateutil for anything else.
+    """
+    try:
+        return dt.datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+    except ValueError:
+        import dateutil.parser  # pylint: disable=import-outside-toplevel
+        return dateutil.parser.parse(timestamp)
+
+
+class Record(collections.abc.Mapping):
+    """A JSON object from the API with a primary key.
+
+    Subclasses list their JSON keys in FIELDS, pk first, and declare the
+    rest of them as slots, followed by any derived attributes.
+    """
+
+    FIELDS = ("pk",)
+    __slots__ = ("pk", "extra")
+
+    def __init__(self, data):
+        """Copy the fields from data, a dictionary decoded from JSON."""
+        if "pk" not in data:
+            raise KeyError("pk")
+        self.extra = None
+        fields = self.FIELDS
+        for key, value in data.items():
+            if key in fields:
+                setattr(self, key, value)
+            else:
+                if self.extra is None:
+                    self.extra = {}
+                self.extra[key] = value
+
+    def __getitem__(self, key):
+        """Return the JSON value for key."""
+        if key in self.FIELDS:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        if self.extra is None:
+            raise KeyError(key)
+        return self.extra[key]
+
+    def __iter__(self):
+        """Iterate over JSON keys, listed fields first."""
+        for key in self.FIELDS:
+            if hasattr(self, key):
+                yield key
+        if self.extra is not None:
+            yield from self.extra
+
+    def __len__(self):
+        """Return the number of JSON keys."""
+        return sum(1 for _ in self)
+
+    @property
+    def data(self):
+        """Return the JSON object as a new dict."""
+        return {key: self[key] for key in self}
+
+    def __eq__(self, other):
+        """Compare the JSON objects, a record may equal a dict."""
+        if isinstance(other, Record):
+            return self.data == other.data
+        return self.data == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        """Show the class name and the JSON object."""
+        return f"{type(self).__name__}({self.data!r})"
+
+
+class Course(Record):
+    """A course."""
+
+    FIELDS = (
+        "pk", "name", "semester", "year", "subtitle", "num_late_days",
+        "allowed_guest_domain", "last_modified",
+    )
+    __slots__ = FIELDS[1:]
+
+
+class Project(Record):
+    """A project.
+
+    Projects have many rarely used settings, which are kept as extras.
+    """
+
+    FIELDS = (
+        "pk", "name", "last_modified", "course", "visible_to_students",
+        "closing_time", "soft_closing_time", "min_group_size",
+        "max_group_size", "expected_student_files",
+    )
+    __slots__ = FIELDS[1:]
+
+
+class Group(Record):
+    """A group, with member uniqnames computed once."""
+
+    FIELDS = (
+        "pk", "project", "extended_due_date", "member_names", "members",
+        "bonus_submissions_remaining", "late_days_used", "num_submissions",
+        "num_submits_towards_limit", "created_at", "last_modified",
+    )
+    __slots__ = FIELDS[1:] + ("uniqnames",)
+
+    def __init__(self, data):
+        """Compute member uniqnames from member usernames."""
+        super().__init__(data)
+        self.uniqnames = [
+            x["username"].replace("@umich.edu", "") for x in data["members"]
+        ]
+
+
+class Submission(Record):
+    """A submission, with its timestamp parsed once as submitted_at."""
+
+    FIELDS = (
+        "pk", "group", "timestamp", "submitter", "submitted_filenames",
+        "discarded_files", "missing_files", "status", "is_past_daily_limit",
+        "is_bonus_submission", "count_towards_total_limit",
+        "does_not_count_for", "position_in_queue", "grading_start_time",
+        "non_deferred_grading_end_time", "last_modified",
+    )
+    __slots__ = FIELDS[1:] + ("submitted_at",)
+
+    def __init__(self, data):
+        """Parse the submission timestamp."""
+        super().__init__(data)
+        self.submitted_at = parse_timestamp(data["timestamp"])
+
+
+def to_json(obj):
+    """Return the JSON object wrapped by a record, for json.dumps(default=)."""
+    if isinstance(obj, Record):
+        return obj.data
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON "
+                    "serializable")
@@ -0,0 +1,97 @@
+"""Profile CPU time or memory allocations while a command runs."""
+import contextlib
+import sys
+
+
+# Number of entries in the summary printed after a profiled command
+SUMMARY_LIMIT = 15
+
+# Number of entries in the allocation report file
+REPORT_LIMIT = 100
+
+# Number of stack frames tracemalloc records for each allocation
+TRACEMALLOC_FRAMES = 10
+
+# Default output file for each kind of profile
+DEFAULT_OUTPUT = {
+    "cpu": "agio.prof",
+    "alloc": "agio-alloc.txt",
+}
+
+
+def profile(mode, path=None, stream=None):
+    """Return a context manager that profiles the with block.
+
+    mode is "cpu" or "alloc".  path defaults to DEFAULT_OUTPUT[mode].  A
+    short summary is printed to stream, which defaults to stderr.
+    """
+    path = path or DEFAULT_OUTPUT[mode]
+    stream = stream or sys.stderr
+    if mode == "cpu":
+        return cpu_profile(path, stream)
+    if mode == "alloc":
+        return alloc_profile(path, stream)
+    raise ValueError(f"Unknown profile mode: {mode}")
+
+
+@contextlib.contextmanager
+def cpu_profile(path, stream):
+    """Profile CPU time with cProfile and save pstats data to path.
+
+    Only the calling thread is profiled.  Time spent waiting on worker
+    threads, like parallel downloads, shows up as lock waits.  Load the
+    file with "python -m pstats" or a viewer like snakeviz.
+    """
+    # pylint: disable=import-outside-toplevel
+    import cProfile
+    import pstats
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
+        print(f"Saved CPU profile to {path}", file=stream)
+        stats = pstats.Stats(profiler, stream=stream)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE)
+        stats.print_stats(SUMMARY_LIMIT)
+
+
+@contextlib.contextmanager
+def alloc_profile(path, stream):
+    """Trace memory allocations with tracemalloc and save a report to path.
+
+    The report lists the peak traced memory and the source lines holding
+    the most memory when the block exits.
+    """
+    import tracemalloc  # pylint: disable=import-outside-toplevel
+    tracemalloc.start(TRACEMALLOC_FRAMES)
+    try:
+        yield
+    finally:
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        snapshot = snapshot.filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+        ])
+        lines = alloc_report(snapshot.statistics("lineno"), peak)
+        with open(path, "w", encoding="utf-8") as outfile:
+            outfile.writelines(f"{x}\n" for x in lines[:REPORT_LIMIT + 1])
+        print(f"Saved allocation report to {path}", file=stream)
+        for line in lines[:SUMMARY_LIMIT + 1]:
+            print(line, file=stream)
+
+
+def alloc_report(statistics, peak):
+    """Return lines describing the peak and the top allocation sites."""
+    lines = [f"Peak traced memory: {peak} B"]
+    for stat in statistics:
+        frame = stat.traceback[0]
+        lines.append(
+            f"{frame.filename}:{frame.lineno}: "
+            f"{stat.size} B in {stat.count} blocks"
+        )
+    return lines
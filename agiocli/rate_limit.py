@@ -0,0 +1,110 @@
+"""Client-side adaptive rate limiting for REST API requests."""
+import random
+import threading
+import time
+
+
+# Default request rates, in requests per second
+MAX_RATE = 50.0
+MIN_RATE = 0.5
+
+# Default number of requests that may be sent back to back
+BURST = 10
+
+# Exponential backoff between retries, in seconds
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 30.0
+
+
+class RateLimiter:
+    """Token bucket with additive increase, multiplicative decrease (AIMD).
+
+    Each request takes one token.  Tokens refill at rate per second, up to
+    burst.  A throttled response, like 429 Too Many Requests, multiplies the
+    rate by decrease, and a Retry-After pauses all requests.  Every
+    successful response adds increase/rate, so the rate grows by about
+    increase per second until the server pushes back again.
+
+    A RateLimiter may be shared by threads.
+
+    """
+
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(self, max_rate=MAX_RATE, min_rate=MIN_RATE, burst=BURST,
+                 increase=1.0, decrease=0.5):
+        """Start at max_rate with a full bucket."""
+        # pylint: disable=too-many-arguments
+        self.max_rate = max_rate
+        self.min_rate = min_rate
+        self.burst = burst
+        self.increase = increase
+        self.decrease = decrease
+        self.rate = max_rate
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.paused_until = 0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a request may be sent."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.burst,
+                    self.tokens + (now - self.updated) * self.rate,
+                )
+                self.updated = now
+                delay = self.paused_until - now
+                if delay <= 0 and self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                if delay <= 0:
+                    delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+
+    def success(self):
+        """Increase the rate additively after a successful response."""
+        with self.lock:
+            self.rate = min(self.max_rate, self.rate + self.increase/self.rate)
+
+    def throttle(self, retry_after=None):
+        """Decrease the rate multiplicatively after a throttled response.
+
+        If the server sent a Retry-After delay in seconds, pause all requests
+        until it has passed.
+        """
+        with self.lock:
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+            self.tokens = min(self.tokens, 0)
+            if retry_after:
+                self.paused_until = max(
+                    self.paused_until, time.monotonic() + retry_after
+                )
+
+
+def parse_retry_after(value):
+    """Return the delay in seconds from a Retry-After header, or None.
+
+    The header is either a number of seconds or an HTTP date.
+    """
+    if value is None:
+        return None
+    if value.strip().isdigit():
+        return int(value)
+    import email.utils  # pylint: disable=import-outside-toplevel
+    try:
+        date = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0, date.timestamp() - time.time())
+
+
+def backoff_delay(attempt, base=BACKOFF_BASE, cap=BACKOFF_MAX):
+    """Return a jittered exponential backoff delay for a retry attempt.
+
+    Use "full jitter," a random delay up to the exponential backoff, so that
+    clients retrying at the same time spread out.
+    """
+    return random.uniform(0, min(cap, base * 2**attempt))
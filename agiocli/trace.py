@@ -0,0 +1,109 @@
+"""Record timed spans and save them in Chrome trace-event format.
+
+Open a saved trace at https://ui.perfetto.dev/ or chrome://tracing.  The
+format is documented at
+https://docs.google.com/document/d/1CvAClvFfyA5R-PhYUmn5OOQtYMH4h6I0nSsKchNAySU/
+"""
+import contextlib
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+
+
+class Tracer:
+    """Collect spans from any thread.
+
+    A span is a "complete" trace event with a name, a category, a start
+    time, a duration and a dictionary of arguments.  Spans recorded by the
+    same thread nest, so a request made while resolving a project appears
+    underneath it.
+
+    """
+
+    def __init__(self):
+        """Start the trace clock with no spans."""
+        self.events = []
+        self.thread_names = {}
+        self.lock = threading.Lock()
+        self.start = time.perf_counter()
+
+    @contextlib.contextmanager
+    def span(self, name, category, **args):
+        """Record the time spent in the with block as a span.
+
+        Yield the span arguments, a dictionary that the block may update
+        with results, like a response status code.  The arguments are
+        copied when the block exits, so later updates are not recorded.
+        """
+        start = time.perf_counter()
+        try:
+            yield args
+        finally:
+            end = time.perf_counter()
+            thread = threading.current_thread()
+            with self.lock:
+                self.thread_names[thread.ident] = thread.name
+                self.events.append({
+                    "name": name,
+                    "cat": category,
+                    "ph": "X",
+                    "ts": (start - self.start) * 1e6,
+                    "dur": (end - start) * 1e6,
+                    "pid": os.getpid(),
+                    "tid": thread.ident,
+                    "args": dict(args),
+                })
+
+    def save(self, path):
+        """Write all spans recorded so far to a JSON file at path."""
+        with self.lock:
+            metadata = [
+                {
+                    "name": "thread_name",
+                    "ph": "M",
+                    "pid": os.getpid(),
+                    "tid": tid,
+                    "args": {"name": name},
+                }
+                for tid, name in self.thread_names.items()
+            ]
+            events = metadata + self.events
+        with open(path, "w", encoding="utf-8") as outfile:
+            json.dump(
+                {"traceEvents": events, "displayTimeUnit": "ms"},
+                outfile,
+                default=str,
+            )
+
+
+def span(tracer, name, category, **args):
+    """Return a span from tracer, or a no-op context manager if it is None."""
+    if tracer is None:
+        return contextlib.nullcontext(args)
+    return tracer.span(name, category, **args)
+
+
+def traced(func):
+    """Record each call to func as a span, if its client has a tracer.
+
+    func must take an APIClient argument named client.  The other arguments
+    are saved with the span.
+    """
+    signature = inspect.signature(func)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        arguments = signature.bind(*args, **kwargs).arguments
+        tracer = getattr(arguments.pop("client"), "tracer", None)
+        if tracer is None:
+            return func(*args, **kwargs)
+        span_args = {
+            key: value for key, value in arguments.items()
+            if value is None or isinstance(value, (str, int, float, bool))
+        }
+        with tracer.span(func.__name__, "resolve", **span_args):
+            return func(*args, **kwargs)
+    return wrapper
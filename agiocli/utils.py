@@ -1,19 +1,32 @@
-"""Common utility functions."""
+"""Common utility functions.
+
+Modules that only some commands need, like pick, dateutil and webbrowser,
+are imported where they are used.  This keeps startup fast for commands
+that never prompt, sort submissions or open a browser.
+"""
+import bisect
+import collections
 import datetime as dt
+import functools
+import hashlib
 import json
 import pathlib
+import queue
 import sys
-import platform
-import subprocess
-import webbrowser
 import itertools
 import re
-import dateutil.parser
-import pick
-try:
-    import gnureadline as readline
-except ImportError:
-    import readline
+import threading
+import time
+from urllib.parse import urljoin
+from agiocli import models, trace
+from agiocli.api_client import APIError, HTTPError
+
+
+# Some imports are deferred to the functions that use them
+# pylint: disable=import-outside-toplevel
+
+# Many small helpers shared by the subcommands live here
+# pylint: disable=too-many-lines
 
 
 # Map semester name to number
@@ -43,10 +56,36 @@ MONTH_SEMESTER_NAME = {
     12: "Fall",
 }
 
+# Current user primary key by (base URL, API token), see get_current_user_pk
+CURRENT_USER_PKS = {}
+CURRENT_USER_PKS_LOCK = threading.Lock()
+
+# Lists fetched in the background while a menu was open, see Prefetch
+PREFETCHES = {}
+PREFETCHES_LOCK = threading.Lock()
+
+# Number of lists fetched at a time while a menu is open
+PREFETCH_JOBS = 2
+
+# Seconds that agio cache warm keeps lists, long enough for office hours
+WARM_TTL_SECONDS = 4*60*60
+
 
 def dict_str(obj):
-    """Format a dictionary as an indented string."""
-    return json.dumps(obj, indent=4)
+    """Format a dictionary or record as an indented string."""
+    return json.dumps(obj, indent=4, default=models.to_json)
+
+
+def bytes_str(num_bytes):
+    """Format a number of bytes as a human readable string."""
+    units = ["B", "KB", "MB", "GB"]
+    power = 0
+    while num_bytes >= 1024 and power < len(units) - 1:
+        num_bytes /= 1024
+        power += 1
+    if power == 0:
+        return f"{num_bytes:.0f} B"
+    return f"{num_bytes:.1f} {units[power]}"
 
 
 def course_str(course):
@@ -103,8 +142,14 @@ def is_current_course(course):
 
 
 def course_match(search, courses):
-    """Return courses matching search term."""
-    year, semester, name = parse_course_string(search)
+    """Return courses matching search term.
+
+    search is a course string, or the (year, semester, name) tuple returned
+    by parse_course_string.
+    """
+    if isinstance(search, str):
+        search = parse_course_string(search)
+    year, semester, name = search
     courses = filter(
         lambda x:
             x["year"] == year and
@@ -200,17 +245,190 @@ def parse_course_string(user_input):
     return year, semester, name
 
 
-def get_current_course_list(client):
-    """Return a sorted list of current and future courses."""
+def get_current_user_pk(client):
+    """Return the primary key of the user authenticated by client.
+
+    The result is memoized for the rest of the process, by base URL and API
+    token.
+    """
+    key = (client.base_url, client.api_token)
+    with CURRENT_USER_PKS_LOCK:
+        if key in CURRENT_USER_PKS:
+            return CURRENT_USER_PKS[key]
     user = client.get("/api/users/current/")
-    courses = client.get(f"/api/users/{user['pk']}/courses_is_admin_for/")
-    courses += client.get(f"/api/users/{user['pk']}/courses_is_staff_for/")
-    courses = sorted(courses, key=course_key, reverse=True)
-    courses = [k for k, v in itertools.groupby(courses)]  # Unique
-    return courses
+    with CURRENT_USER_PKS_LOCK:
+        CURRENT_USER_PKS[key] = user["pk"]
+    return user["pk"]
+
+
+@trace.traced
+def get_current_course_list(client):
+    """Return a sorted list of current and future courses.
+
+    The admin and staff course lists are fetched concurrently.
+    """
+    user_pk = get_current_user_pk(client)
+    import concurrent.futures
+    with concurrent.futures.ThreadPoolExecutor(2) as executor:
+        course_lists = list(executor.map(client.get, [
+            f"/api/users/{user_pk}/courses_is_admin_for/",
+            f"/api/users/{user_pk}/courses_is_staff_for/",
+        ]))
+
+    # Unique by primary key, a user may be both admin and staff
+    courses = {}
+    for course in itertools.chain.from_iterable(course_lists):
+        courses.setdefault(course["pk"], models.Course(course))
+    return sorted(courses.values(), key=course_key, reverse=True)
+
+
+def prefetched(func):
+    """Decorate a list function, func(obj, client), to use a Prefetch result.
+
+    A prefetch that failed or was cancelled is ignored, and func fetches the
+    list again, as it does when called with keyword arguments, like
+    refresh=True.  The undecorated function is saved as the fetch attribute.
+    """
+    @functools.wraps(func)
+    def wrapper(obj, client, **kwargs):
+        with PREFETCHES_LOCK:
+            future = PREFETCHES.pop((func, client, obj["pk"]), None)
+        if future is not None and not kwargs:
+            try:
+                return future.result()
+            except (Exception, SystemExit):  # pylint: disable=broad-except
+                pass
+        return func(obj, client, **kwargs)
+    wrapper.fetch = func
+    return wrapper
+
+
+class Prefetch:
+    """Fetch the next list in the background while the user picks from a menu.
+
+    On enter, func(obj, client) is started for each obj in the menu, in menu
+    order, PREFETCH_JOBS at a time.  func is a list function decorated with
+    @prefetched, or None to fetch nothing.  Call keep() with the object the
+    user picked.  On exit, fetches for other objects that have not started
+    are cancelled, and the next call to func with the kept object returns
+    its result.
+
+    Fetches run on daemon threads.  A ThreadPoolExecutor joins its workers
+    at interpreter exit, even after shutdown(wait=False), so an abandoned
+    fetch of a large list would delay exit.
+    """
+
+    def __init__(self, func, objs, client):
+        """Prefetch func(obj, client) for each obj in objs."""
+        self.fetch = func.fetch if func else None
+        self.objs = objs
+        self.client = client
+        self.pending = queue.Queue()
+        self.futures = {}
+        self.kept = None
+
+    def __enter__(self):
+        """Start fetching in the background."""
+        if self.fetch is None:
+            return self
+        import concurrent.futures
+        for obj in self.objs:
+            future = concurrent.futures.Future()
+            self.futures[obj["pk"]] = future
+            self.pending.put((future, obj))
+        for _ in range(min(PREFETCH_JOBS, len(self.objs))):
+            threading.Thread(
+                target=self.work, name="agio-prefetch", daemon=True
+            ).start()
+        return self
+
+    def work(self):
+        """Run pending fetches until there are none left."""
+        while True:
+            try:
+                future, obj = self.pending.get_nowait()
+            except queue.Empty:
+                return
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(self.fetch(obj, self.client))
+            except BaseException as err:  # pylint: disable=broad-except
+                future.set_exception(err)
+
+    def keep(self, obj):
+        """Keep the prefetched list for obj, the choice from the menu."""
+        self.kept = obj["pk"]
+
+    def __exit__(self, *exc_info):
+        """Cancel fetches for other objects and save the kept one."""
+        for pk, future in self.futures.items():
+            if pk != self.kept:
+                future.cancel()
+        if self.kept in self.futures:
+            with PREFETCHES_LOCK:
+                PREFETCHES[(self.fetch, self.client, self.kept)] = \
+                    self.futures[self.kept]
+
+
+def get_aliased(scope, shorthand, path, client, check=None):
+    """Return the object that shorthand resolved to before, or None.
+
+    scope is the path of the list shorthand was matched against, and path
+    is a format string for the object's path with its primary key.  The
+    object is looked up directly by primary key.  If it no longer exists,
+    or if check(obj) is false, the alias is deleted.  Aliases are saved in
+    the client's cache, so there are none without one.
+    """
+    # pylint: disable=too-many-arguments
+    if client.cache is None:
+        return None
+    scope = urljoin(client.base_url, scope)
+    pk = client.cache.get_alias(  # pylint: disable=invalid-name
+        client.api_token, scope, shorthand
+    )
+    if pk is None:
+        return None
+    # Raise errors whatever the client's setting, so that a 404 is caught
+    try:
+        obj = client.get(path.format(pk), raise_errors=True)
+    except HTTPError as err:
+        if err.status_code != 404:
+            if client.raise_errors:
+                raise
+            sys.exit(f"Error: {err}")
+        obj = None
+    except APIError as err:
+        if client.raise_errors:
+            raise
+        sys.exit(f"Error: {err}")
+    if obj is None or (check is not None and not check(obj)):
+        client.cache.delete_alias(client.api_token, scope, shorthand)
+        return None
+    return obj
+
+
+def save_alias(scope, shorthand, obj, path, client):
+    """Save the primary key of obj, which shorthand resolved to in scope.
+
+    obj is also cached as the response from path, so that the next direct
+    lookup makes no request.
+    """
+    # pylint: disable=too-many-arguments
+    if client.cache is None:
+        return
+    client.cache.put_alias(
+        client.api_token, urljoin(client.base_url, scope), shorthand,
+        obj["pk"],
+    )
+    client.cache.put(
+        client.api_token, urljoin(client.base_url, path.format(obj["pk"])),
+        json.dumps(obj, default=models.to_json),
+    )
 
 
-def get_course_smart(course_arg, client):
+@trace.traced
+def get_course_smart(course_arg, client, prefetch=None):
     """Interact with the user to select a course.
 
     1. If course_arg is a number, look up course by primary key
@@ -218,12 +436,27 @@ def get_course_smart(course_arg, client):
     3. If course_arg is a string, try to extract semester, year and name, then
        match against list of courses for which user is an admin.
 
+    prefetch is an optional list function, like get_course_project_list,
+    called in the background for each course in the menu while the user
+    picks one.
+
     This function provides sanity checks and may exit with an error message.
     """
     # User provides course PK
     if course_arg and course_arg.isnumeric():
         return client.get(f"/api/courses/{course_arg}/")
 
+    # Try a course string resolved before.  Use the parsed string, because
+    # an abbreviated or current semester may be written many ways.
+    if course_arg:
+        search = parse_course_string(course_arg)
+        shorthand = " ".join(str(x) for x in search)
+        course = get_aliased(
+            "/api/courses/", shorthand, "/api/courses/{}/", client
+        )
+        if course is not None:
+            return course
+
     # Get a list of courses sorted by year, semester and name
     courses = get_current_course_list(client)
 
@@ -232,17 +465,20 @@ def get_course_smart(course_arg, client):
         if not courses:
             sys.exit("Error: No current courses, try 'agio courses -l'")
         else:
+            import pick
             options = [pick.Option(course_str(x), x) for x in courses]
-            selected_courses = pick.pick(
-                options=options,
-                title=("Select a course:"),
-                multiselect=False,
-            )
-            assert selected_courses
+            with Prefetch(prefetch, courses, client) as menu:
+                selected_courses = pick.pick(
+                    options=options,
+                    title=("Select a course:"),
+                    multiselect=False,
+                )
+                assert selected_courses
+                menu.keep(selected_courses[0].value)
             return selected_courses[0].value
 
     # Try to match a course
-    matches = course_match(course_arg, courses)
+    matches = course_match(search, courses)
     if not matches:
         courses_str = "\n".join(course_str(i) for i in courses)
         sys.exit(
@@ -255,6 +491,9 @@ def get_course_smart(course_arg, client):
             f"Error: multiple courses match '{course_arg}'\n"
             f"{matches_str}"
         )
+    save_alias(
+        "/api/courses/", shorthand, matches[0], "/api/courses/{}/", client
+    )
     return matches[0]
 
 
@@ -336,50 +575,79 @@ def project_str(project):
     return f"[{project['pk']}] {project['name']}"
 
 
-def project_match(search, projects):
-    """Return projects matching search term."""
-    assert projects
-    asstype, num, subtitle = parse_project_string(search)
+@functools.lru_cache(maxsize=4096)
+def parse_project_name(name):
+    """Return parse_project_string(name), or None, caching the result.
 
-    # Filter for only parsable projects
-    projects = filter(
-        lambda x: parse_project_string_skipper(x["name"]), projects
-    )
+    Project names repeat across lookups in one process, so each distinct
+    name is parsed at most once.
+    """
+    return parse_project_string_skipper(name)
 
-    # Remove projects with an assignment type mismatch (Lab vs. Project, etc.)
-    if asstype:
-        projects = filter(
-            lambda x:
-                parse_project_string(x["name"])[0].lower() == asstype.lower(),
-            projects
-        )
 
-    # Remove projects with a number mismatch
-    if num:
-        projects = filter(
-            lambda x: parse_project_string(x["name"])[1] == num,
-            projects
-        )
+class ProjectIndex:
+    """Projects with names parsed once, for matching many search terms.
 
-    # Remove projects with a name mismatch, tolerating substring match
-    if subtitle:
-        projects = filter(
-            lambda x:
-                subtitle.lower() in parse_project_string(x["name"])[2].lower(),
-            projects
-        )
+    Projects whose names can't be parsed are left out.  Matches are returned
+    in the original project order.
+    """
+
+    # pylint: disable=too-few-public-methods
+
+    def __init__(self, projects):
+        """Parse each project name and index projects by type and number."""
+        self.entries = []
+        self.by_type = collections.defaultdict(list)
+        self.by_num = collections.defaultdict(list)
+        self.by_type_num = collections.defaultdict(list)
+        for project in projects:
+            parsed = parse_project_name(project["name"])
+            if not parsed:
+                continue
+            asstype, num, subtitle = parsed
+            entry = (project, subtitle.lower())
+            self.entries.append(entry)
+            self.by_type[asstype.lower()].append(entry)
+            self.by_num[num].append(entry)
+            self.by_type_num[asstype.lower(), num].append(entry)
+
+    def match(self, search):
+        """Return projects matching search term."""
+        asstype, num, subtitle = parse_project_string(search)
+
+        # Narrow by assignment type (Lab vs. Project, etc.) and number
+        if asstype and num:
+            entries = self.by_type_num.get((asstype.lower(), num), [])
+        elif asstype:
+            entries = self.by_type.get(asstype.lower(), [])
+        elif num:
+            entries = self.by_num.get(num, [])
+        else:
+            entries = self.entries
+
+        # Tolerate a substring match on the name
+        subtitle = subtitle.lower()
+        return [x for x, y in entries if subtitle in y]
 
-    return list(projects)
+
+def project_match(search, projects):
+    """Return projects matching search term."""
+    assert projects
+    return ProjectIndex(projects).match(search)
 
 
+@prefetched
+@trace.traced
 def get_course_project_list(course, client):
     """Return a sorted list of projects for course."""
     projects = client.get(f"/api/courses/{course['pk']}/projects/")
-    projects = sorted(projects, key=lambda x: x["name"])
+    projects = [models.Project(x) for x in projects]
+    projects = sorted(projects, key=lambda x: x.name)
     return projects
 
 
-def get_project_smart(project_arg, course_arg, client):
+@trace.traced
+def get_project_smart(project_arg, course_arg, client, prefetch=None):
     """Interact with the user to select a project.
 
     1. If project_arg is a number, look up project by primary key
@@ -387,14 +655,25 @@ def get_project_smart(project_arg, course_arg, client):
     3. If project_arg is None, prompt with list of projects for selected course
     4. If project_arg is a string, try to match project name
 
+    prefetch is an optional list function, like get_group_list, called in
+    the background for each project in the menu while the user picks one.
+
     This function provides sanity checks and may exit with an error message.
     """
     # User provides project PK
     if project_arg and project_arg.isnumeric():
         return client.get(f"/api/projects/{project_arg}/")
 
-    # Get a course and a sorted list of projects
-    course = get_course_smart(course_arg, client)
+    # Get a course.  Try a project string resolved before, then get a sorted
+    # list of projects.
+    course = get_course_smart(
+        course_arg, client, prefetch=get_course_project_list
+    )
+    scope = f"/api/courses/{course['pk']}/projects/"
+    if project_arg:
+        project = get_aliased(scope, project_arg, "/api/projects/{}/", client)
+        if project is not None:
+            return project
     projects = get_course_project_list(course, client)
     if not projects:
         sys.exit("Error: No projects for course, try 'agio courses -l'")
@@ -402,17 +681,20 @@ def get_project_smart(project_arg, course_arg, client):
     # No project input from the user.  Show all projects for current course and
     # and prompt the user.
     if not project_arg:
+        import pick
         options = [pick.Option(project_str(x), x) for x in projects]
-        selected_projects = pick.pick(
-            options=options,
-            title="Select a project:",
-            multiselect=False,
-        )
-        assert selected_projects
+        with Prefetch(prefetch, projects, client) as menu:
+            selected_projects = pick.pick(
+                options=options,
+                title="Select a project:",
+                multiselect=False,
+            )
+            assert selected_projects
+            menu.keep(selected_projects[0].value)
         return selected_projects[0].value
 
     # User provides strings, try to match a project
-    matches = project_match(project_arg, projects)
+    matches = ProjectIndex(projects).match(project_arg)
     if not matches:
         projects_str = "\n".join(project_str(i) for i in projects)
         sys.exit(
@@ -425,6 +707,7 @@ def get_project_smart(project_arg, course_arg, client):
             f"Error: multiple projects match '{project_arg}'\n"
             f"{matches_str}"
         )
+    save_alias(scope, project_arg, matches[0], "/api/projects/{}/", client)
     return matches[0]
 
 
@@ -443,6 +726,8 @@ def group_emails(group):
 
 def group_uniqnames(group):
     """Return group member uniqnames."""
+    if isinstance(group, models.Group):
+        return group.uniqnames
     return [x.replace("@umich.edu", "") for x in group_emails(group)]
 
 
@@ -453,17 +738,126 @@ def is_group_member(uniqname, group):
 
 def group_match(uniqname, groups):
     """Return groups where uniqname is a member."""
-    matches = filter(lambda x: is_group_member(uniqname, x), groups)
-    return list(matches)
+    return GroupIndex(groups).match(uniqname)
 
 
-def get_group_list(project, client):
-    """Return a sorted list of groups for project."""
-    groups = client.get(f"/api/projects/{project['pk']}/groups/")
-    groups = sorted(groups, key=lambda x: x["pk"])
+class GroupIndex:
+    """Groups indexed by member uniqname, for looking up many uniqnames.
+
+    Building the index visits each member once, after which each lookup
+    takes constant time.
+    """
+
+    def __init__(self, groups):
+        """Map each member uniqname to its groups, in the original order."""
+        self.by_uniqname = collections.defaultdict(list)
+        for group in groups:
+            for uniqname in dict.fromkeys(group_uniqnames(group)):
+                self.by_uniqname[uniqname].append(group)
+
+    @property
+    def uniqnames(self):
+        """Return the uniqnames of all group members."""
+        return self.by_uniqname.keys()
+
+    def match(self, uniqname):
+        """Return groups where uniqname is a member."""
+        return list(self.by_uniqname.get(uniqname, []))
+
+    def lookup(self, uniqnames):
+        """Resolve many uniqnames at once.
+
+        Return three dictionaries: uniqnames in exactly one group, mapped to
+        the group, uniqnames in no group, mapped to an empty list, and
+        uniqnames in more than one group, mapped to the groups.  Email
+        addresses are accepted in place of uniqnames.
+        """
+        found, missing, duplicates = {}, {}, {}
+        for uniqname in uniqnames:
+            uniqname = uniqname.strip().replace("@umich.edu", "")
+            matches = self.match(uniqname)
+            if not matches:
+                missing[uniqname] = matches
+            elif len(matches) > 1:
+                duplicates[uniqname] = matches
+            else:
+                found[uniqname] = matches[0]
+        return found, missing, duplicates
+
+
+@prefetched
+@trace.traced
+def get_group_list(project, client, refresh=False):
+    """Return a sorted list of groups for project.
+
+    With refresh=True, ignore a cached list.
+    """
+    groups = client.get(
+        f"/api/projects/{project['pk']}/groups/", refresh=refresh
+    )
+    groups = [models.Group(x) for x in groups]
+    groups = sorted(groups, key=lambda x: x.pk)
     return groups
 
 
+class PrefixCompleter:
+    """Complete words by prefix, a readline completer function.
+
+    Words are sorted once.  readline calls the completer with state 0, 1,
+    2, ... until it returns None, and the matches for a prefix are found
+    with a binary search on the first call.  Each TAB takes O(log n + k)
+    for n words and k matches.
+
+    https://docs.python.org/3/library/readline.html#readline.set_completer
+    """
+
+    def __init__(self, words):
+        """Sort and deduplicate words."""
+        self.words = sorted(set(words))
+        self.text = None
+        self.matches = []
+
+    def complete(self, text):
+        """Return the words that start with text, in sorted order."""
+        start = bisect.bisect_left(self.words, text)
+        end = bisect.bisect_left(self.words, text + chr(0x10FFFF), lo=start)
+        return self.words[start:end]
+
+    def __call__(self, text, state):
+        """Return the match number state for text, or None."""
+        if state == 0 or text != self.text:
+            self.text = text
+            self.matches = self.complete(text)
+        if state < len(self.matches):
+            return self.matches[state]
+        return None
+
+
+def lookup_groups(lines, project, client):
+    """Print the group of each uniqname in lines, one uniqname per line.
+
+    Uniqnames in no group or in more than one group are reported, and then
+    the function exits with an error.
+    """
+    index = GroupIndex(get_group_list(project, client))
+    found, missing, duplicates = index.lookup(x for x in lines if x.strip())
+    for uniqname, group in found.items():
+        print(f"{uniqname} {group_str(group)}")
+    for uniqname in missing:
+        print(f"Error: uniqname not in any group: {uniqname}",
+              file=sys.stderr)
+    for uniqname, matches in duplicates.items():
+        matches_str = ", ".join(group_str(x) for x in matches)
+        print(f"Error: uniqname in more than one group: {uniqname} "
+              f"{matches_str}", file=sys.stderr)
+    if missing or duplicates:
+        sys.exit(
+            f"Error: {len(missing)} uniqnames not in any group, "
+            f"{len(duplicates)} in more than one group"
+        )
+
+
+@trace.traced
 def get_group_smart(group_arg, project_arg, course_arg, client):
     """Interact with the user to select a group.
 
@@ -480,44 +874,57 @@ def get_group_smart(group_arg, project_arg, course_arg, client):
         return client.get(f"/api/groups/{group_arg}/")
 
     # Get a project and list of groups
-    project = get_project_smart(project_arg, course_arg, client)
+    project = get_project_smart(
+        project_arg, course_arg, client, prefetch=get_group_list
+    )
+
+    # Try a uniqname resolved before.  Students may change groups, so check
+    # that the uniqname is still a member.
+    scope = f"/api/projects/{project['pk']}/groups/"
+    if group_arg:
+        group = get_aliased(
+            scope, group_arg, "/api/groups/{}/", client,
+            check=lambda x: is_group_member(group_arg, x),
+        )
+        if group is not None:
+            return group
     groups = get_group_list(project, client)
     if not groups:
         sys.exit("Error: No groups for project, try 'agio projects -l'")
 
-    # No group input from the user.  Help them select a uniqname with an
-    # auto complete prompt.
+    # No group input from the user.  Help them select a uniqname or group pk
+    # with an auto complete prompt.
+    index = GroupIndex(groups)
     if not group_arg:
-        # Get a list of uniqnames
-        uniqnames = set()
-        for group in groups:
-            uniqnames.update(group_uniqnames(group))
-
-        # Register the completer function
-        def uniqname_completer(text, state):
-            """Complete a uniqname, callback run by readline.
-
-            https://stackoverflow.com/questions/187621/how-to-make-a-python-command-line-program-autocomplete-arbitrary-things-not-int/187660#187660
-            """
-            options = [i for i in uniqnames if i.startswith(text)]
-            if state < len(options):
-                return options[state]
-            return None
-        readline.set_completer(uniqname_completer)
+        # Register the completer, built once for this prompt
+        try:
+            import gnureadline as readline
+        except ImportError:
+            import readline
+        readline.set_completer(PrefixCompleter(
+            itertools.chain(index.uniqnames, (str(x["pk"]) for x in groups))
+        ))
 
         # Use the tab key for completion
         readline.parse_and_bind('tab: complete')
 
         # Prompt the user to select a uniqname
         while True:
-            uniqname = input("Uniqname (TAB to autocomplete): ")
+            uniqname = input("Uniqname or group pk (TAB to autocomplete): ")
             assert uniqname
             uniqname = uniqname.strip()
             group_arg = uniqname
             break
 
+        # User provides group PK, which is already in the list
+        if group_arg.isnumeric():
+            matches = [x for x in groups if x["pk"] == int(group_arg)]
+            if not matches:
+                sys.exit(f"Error: group not in project: {group_arg}")
+            return matches[0]
+
     # Try to match uniqname to a group member
-    matches = group_match(group_arg, groups)
+    matches = index.match(group_arg)
     if not matches:
         sys.exit(f"Error: uniqname not in any group: {group_arg}")
     elif len(matches) > 1:
@@ -526,11 +933,13 @@ def get_group_smart(group_arg, project_arg, course_arg, client):
             f"Error: uniqname in more than one group: {group_arg}"
             f"{matches_str}"
         )
+    save_alias(scope, group_arg, matches[0], "/api/groups/{}/", client)
     return matches[0]
 
 
 def is_wsl():
     """Check if user is running WSL."""
+    import platform
     return 'microsoft' in platform.uname().release
 
 
@@ -540,36 +949,48 @@ def open_web(url):
         # Need to escape & in Windows
         # https://stackoverflow.com/questions/1327431/how-do-i-escape-ampersands-in-batch-files
         url = url.replace('&', '^&')
+        import subprocess
         subprocess.run(
             ['cmd.exe', '/c', 'start', url],
             stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
             check=True
         )
     else:
+        import webbrowser
         webbrowser.open(url)
 
 
 def submission_key(submission):
     """Return a tuple for sorting submissions by timestamp."""
-    return dateutil.parser.parse(submission["timestamp"])
+    if isinstance(submission, models.Submission):
+        return submission.submitted_at
+    return models.parse_timestamp(submission["timestamp"])
 
 
 def submission_str(submission):
     """Format submission as a string."""
-    timestamp = dateutil.parser.parse(submission["timestamp"])
+    timestamp = submission_key(submission)
     timestamp_human = timestamp.strftime("%Y-%m-%d %H:%M:%S")
     return (
         f"[{submission['pk']}] {timestamp_human}  "
     )
 
 
-def get_submission_list(group, client):
-    """Return a sorted list of submissions for a group."""
-    submissions = client.get(f"/api/groups/{group['pk']}/submissions/")
+@trace.traced
+def get_submission_list(group, client, refresh=False):
+    """Return a sorted list of submissions for a group.
+
+    With refresh=True, ignore a cached list.
+    """
+    submissions = client.get(
+        f"/api/groups/{group['pk']}/submissions/", refresh=refresh
+    )
+    submissions = [models.Submission(x) for x in submissions]
     submissions = sorted(submissions, key=submission_key, reverse=True)
     return submissions
 
 
+@trace.traced
 def get_submission_smart(
         submission_arg, group_arg, project_arg, course_arg, client):
     """Interact with the user to select a submission.
@@ -603,6 +1024,7 @@ def get_submission_smart(
     # No submissions input from the user.  Show all submissions for this group
     # and prompt the user.
     if not submission_arg:
+        import pick
         options = [pick.Option(submission_str(x), x) for x in submissions]
         selected_submissions = pick.pick(
             options=options,
@@ -625,11 +1047,12 @@ def get_submission_smart(
     )
 
 
-def download_submission(submission, group_arg, client):
+def download_submission(submission, group_arg, client, jobs=1):
     """Download the submission files.
 
     If there's one file, download it.  If there are multiple, then download to
-    a directory.
+    a directory, fetching up to jobs files in parallel.  Print the aggregate
+    throughput when done.
 
     """
     # If the user provides a group argument like a uniqname or group pk, prefix
@@ -640,7 +1063,7 @@ def download_submission(submission, group_arg, client):
         prefix = f"submission-{submission['pk']}"
 
     # Download file to PWD.  If there are multiple files, put them in a new
-    # directory.
+    # directory.  Check for clobbering before any download starts.
     filenames = submission['submitted_filenames']
     if not filenames:
         sys.exit(
@@ -649,26 +1072,314 @@ def download_submission(submission, group_arg, client):
         )
     elif len(filenames) == 1:
         filename = filenames[0]
-        target = pathlib.Path(f"{prefix}-{filename}")
-        download_file(filename, submission, target, client)
+        targets = {filename: pathlib.Path(f"{prefix}-{filename}")}
+        if targets[filename].exists():
+            sys.exit(f"Error: refuse to clobber file: {targets[filename]}")
     else:
         dirname = pathlib.Path(prefix)
         if dirname.exists():
             sys.exit(f"Error: refuse to clobber directory: {dirname}")
         dirname.mkdir()
-        for filename in filenames:
-            download_file(filename, submission, dirname/filename, client)
+        targets = {filename: dirname/filename for filename in filenames}
+
+    # Download files in parallel
+    start = time.perf_counter()
+    import concurrent.futures
+    with concurrent.futures.ThreadPoolExecutor(jobs) as executor:
+        sizes = list(executor.map(
+            lambda x: download_file(x[0], submission, x[1], client),
+            targets.items(),
+        ))
+    elapsed = time.perf_counter() - start
+    throughput = sum(sizes) / elapsed if elapsed else 0
+    print(
+        f"Downloaded {len(sizes)} files, {bytes_str(sum(sizes))} "
+        f"in {elapsed:.1f}s ({bytes_str(throughput)}/s)"
+    )
 
 
 def download_file(filename, submission, target, client):
     """Download the file named filename from submission pk submission.
 
-    Save the file in path target/filename.
+    Save the file in path target/filename.  The file is streamed to disk, so
+    memory use does not depend on its size.  Return the size in bytes.
     """
     if target.exists():
         sys.exit(f"Error: refuse to clobber file: {target}")
     url = f"/api/submissions/{submission['pk']}/file/?filename={filename}"
-    data = client.get(url)
-    with target.open("wb") as targetfile:
-        targetfile.write(data)
+    size = client.download(url, target)
     print(f"Saved {target}")
+    return size
+
+
+def group_dirname(group):
+    """Return a directory name for group from its member uniqnames and pk."""
+    uniqnames = "_".join(group_uniqnames(group))
+    return f"{uniqnames}-{group['pk']}"
+
+
+def map_groups(func, groups, jobs=1):
+    """Call func on each group, running up to jobs calls in parallel.
+
+    An APIError for one group doesn't stop the others.  Print each failure
+    and return a list of (group, error) pairs.
+    """
+    failures = []
+
+    def call(group):
+        """Call func, recording an APIError as a failure."""
+        try:
+            func(group)
+        except APIError as err:
+            print(f"Error: group {group_str(group)}: {err}", file=sys.stderr)
+            failures.append((group, err))
+
+    import concurrent.futures
+    with concurrent.futures.ThreadPoolExecutor(jobs) as executor:
+        list(executor.map(call, groups))
+    return failures
+
+
+def read_manifest(path):
+    """Return manifest entries keyed by submission pk and file path.
+
+    The manifest is in JSON Lines format.  A truncated last line, left by an
+    interrupted run, is ignored.
+    """
+    entries = {}
+    if not path.exists():
+        return entries
+    with path.open(encoding="utf-8") as infile:
+        for line in infile:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            entries[(entry["submission"], entry["file"])] = entry
+    return entries
+
+
+def download_all_submissions(project, client, jobs=1):
+    """Download the final graded submission of every group in project.
+
+    Files are saved to project-PK-submissions/UNIQNAMES-GROUPPK/.  Up to jobs
+    groups are downloaded in parallel.  Each finished file is appended to
+    manifest.jsonl with its group pk, submission pk, path, size and SHA-256.
+    Rerunning after an interruption skips files already in the manifest.
+    """
+    dest = pathlib.Path(f"project-{project['pk']}-submissions")
+    dest.mkdir(exist_ok=True)
+    manifest_path = dest/"manifest.jsonl"
+    done = read_manifest(manifest_path)
+    counts = collections.Counter()
+    lock = threading.Lock()
+
+    # Groups without submissions have no final graded submission.  Submission
+    # counts in a cached group list may be out of date.
+    groups = get_group_list(project, client, refresh=True)
+    groups = [x for x in groups if x["num_submissions"]]
+
+    def download_group(group):
+        """Download the files of one group's final graded submission."""
+        submission = client.get(
+            f"/api/groups/{group['pk']}/ultimate_submission/"
+        )
+        group_dir = dest/group_dirname(group)
+        group_dir.mkdir(exist_ok=True)
+        for filename in submission["submitted_filenames"]:
+            target = group_dir/filename
+            relpath = target.relative_to(dest).as_posix()
+            entry = done.get((submission["pk"], relpath))
+            if (entry and target.exists() and
+                    target.stat().st_size == entry["size"]):
+                with lock:
+                    counts["skipped"] += 1
+                continue
+            digest = hashlib.sha256()
+            size = client.download(
+                f"/api/submissions/{submission['pk']}/file/"
+                f"?filename={filename}",
+                target,
+                digest=digest,
+            )
+            entry = {
+                "group": group["pk"],
+                "submission": submission["pk"],
+                "file": relpath,
+                "size": size,
+                "sha256": digest.hexdigest(),
+            }
+            with lock:
+                manifest.write(json.dumps(entry) + "\n")
+                manifest.flush()
+                counts["files"] += 1
+                counts["bytes"] += size
+            print(f"Saved {target}")
+
+    start = time.perf_counter()
+    with manifest_path.open("a", encoding="utf-8") as manifest:
+        # Terminate a truncated last line left by an interrupted run
+        if manifest.tell() and manifest_path.read_bytes()[-1:] != b"\n":
+            manifest.write("\n")
+        failures = map_groups(download_group, groups, jobs)
+    elapsed = time.perf_counter() - start
+    throughput = counts["bytes"] / elapsed if elapsed else 0
+    print(
+        f"Downloaded {counts['files']} files from {len(groups)} groups, "
+        f"{bytes_str(counts['bytes'])} in {elapsed:.1f}s "
+        f"({bytes_str(throughput)}/s), skipped {counts['skipped']} files"
+    )
+    if failures:
+        sys.exit(f"Error: {len(failures)} groups failed, rerun to retry")
+
+
+def sync_submissions(project, dest, client, jobs=1):
+    """Mirror every submission of every group in project to directory dest.
+
+    Submissions are saved to dest/UNIQNAMES-GROUPPK/submission-PK/.  A high
+    water mark for each group, its submission count and latest submission
+    pk, is stored in dest/.agio-sync.json.  A group whose submission count
+    is unchanged since the last run is skipped without any request, and only
+    submissions newer than the high water mark are downloaded.  Up to jobs
+    groups are synced in parallel.  Group and submission lists are never
+    read from the cache, because a stale count would hide new submissions.
+    """
+    dest.mkdir(parents=True, exist_ok=True)
+    state_path = dest/".agio-sync.json"
+    state = {}
+    if state_path.exists():
+        state = json.loads(state_path.read_text(encoding="utf-8"))
+    counts = collections.Counter()
+    lock = threading.Lock()
+
+    def sync_group(group):
+        """Download one group's submissions newer than its high water mark."""
+        mark = state.get(str(group["pk"]), {"num_submissions": 0, "pk": 0})
+        if group["num_submissions"] == mark["num_submissions"]:
+            with lock:
+                counts["unchanged"] += 1
+            return
+        submissions = get_submission_list(group, client, refresh=True)
+        new_submissions = [x for x in submissions if x["pk"] > mark["pk"]]
+        for submission in new_submissions:
+            submission_dir = (
+                dest/group_dirname(group)/f"submission-{submission['pk']}"
+            )
+            submission_dir.mkdir(parents=True, exist_ok=True)
+            for filename in submission["submitted_filenames"]:
+                # Files from an interrupted run are complete, thanks to the
+                # atomic rename in download()
+                target = submission_dir/filename
+                if target.exists():
+                    continue
+                size = client.download(
+                    f"/api/submissions/{submission['pk']}/file/"
+                    f"?filename={filename}",
+                    target,
+                )
+                with lock:
+                    counts["files"] += 1
+                    counts["bytes"] += size
+                print(f"Saved {target}")
+        with lock:
+            counts["changed"] += 1
+            counts["submissions"] += len(new_submissions)
+            state[str(group["pk"])] = {
+                "num_submissions": group["num_submissions"],
+                "pk": max([mark["pk"]] + [x["pk"] for x in submissions]),
+            }
+
+    # Submission counts in a cached group list may be out of date
+    start = time.perf_counter()
+    groups = get_group_list(project, client, refresh=True)
+    try:
+        failures = map_groups(sync_group, groups, jobs)
+    finally:
+        # Save progress, even after an error.  A group's mark is only
+        # updated once all of its new submissions are downloaded.
+        tmp_path = state_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(state, indent=2), encoding="utf-8")
+        tmp_path.replace(state_path)
+    elapsed = time.perf_counter() - start
+    print(
+        f"Synced {counts['submissions']} new submissions "
+        f"({counts['files']} files, {bytes_str(counts['bytes'])}) "
+        f"from {counts['changed']} changed groups "
+        f"in {elapsed:.1f}s, {counts['unchanged']} groups unchanged"
+    )
+    if failures:
+        sys.exit(f"Error: {len(failures)} groups failed, rerun to retry")
+
+
+def warm_cache(course, client, projects=None, submissions=False, jobs=1,
+               ttl=WARM_TTL_SECONDS):
+    """Fetch the projects of course and their groups into the client's cache.
+
+    Warm projects, a list of course's projects, or all of them by default.
+    With submissions=True, also fetch each group's submission list.  Up to
+    jobs lists are fetched in parallel.  Lists are always fetched fresh and
+    cached for ttl seconds, so that they last through office hours.  The
+    course, projects and groups are also cached by primary key, so that
+    lookups by alias make no request.  Print progress and a summary of what
+    was cached.
+    """
+    # pylint: disable=too-many-arguments,too-many-locals
+    counts = collections.Counter()
+    lock = threading.Lock()
+
+    def cache_objects(objs, path):
+        """Cache each object as the response from its detail path."""
+        for obj in objs:
+            client.cache.put(
+                client.api_token,
+                urljoin(client.base_url, path.format(obj["pk"])),
+                json.dumps(obj, default=models.to_json),
+                ttl=ttl,
+            )
+        with lock:
+            counts["objects"] += len(objs)
+
+    def warm_project(project):
+        """Cache the groups of one project."""
+        groups = client.get(
+            f"/api/projects/{project['pk']}/groups/", refresh=True, ttl=ttl
+        )
+        cache_objects(groups, "/api/groups/{}/")
+        print(f"Cached {len(groups)} groups of {project_str(project)}")
+        return groups
+
+    def warm_group(group):
+        """Cache the submission list of one group."""
+        submission_list = client.get(
+            f"/api/groups/{group['pk']}/submissions/", refresh=True, ttl=ttl
+        )
+        with lock:
+            counts["objects"] += len(submission_list)
+            counts["groups"] += 1
+            print(
+                f"[{counts['groups']}/{len(groups)}] Cached "
+                f"{len(submission_list)} submissions of {group_str(group)}"
+            )
+
+    start = time.perf_counter()
+    bytes_stored = client.cache.bytes_stored
+    cache_objects([course], "/api/courses/{}/")
+    if projects is None:
+        projects = client.get(
+            f"/api/courses/{course['pk']}/projects/", refresh=True, ttl=ttl
+        )
+    cache_objects(projects, "/api/projects/{}/")
+    import concurrent.futures
+    with concurrent.futures.ThreadPoolExecutor(jobs) as executor:
+        groups = list(itertools.chain.from_iterable(
+            executor.map(warm_project, projects)
+        ))
+    failures = map_groups(warm_group, groups, jobs) if submissions else []
+    elapsed = time.perf_counter() - start
+    print(
+        f"Cached {counts['objects']} objects for {ttl / 3600:g} hours, "
+        f"{bytes_str(client.cache.bytes_stored - bytes_stored)} in "
+        f"{elapsed:.1f}s"
+    )
+    if failures:
+        sys.exit(f"Error: {len(failures)} groups failed, rerun to retry")
@@ -0,0 +1,150 @@
+"""Benchmark local matching, sorting and formatting on synthetic inputs.
+
+Each benchmark runs on inputs of every size, generated by the stand-in
+server's SyntheticCourse.  Save the results as a baseline, then compare a
+later run against it to catch regressions in the hot local paths.
+
+$ python benchmarks/bench_local.py --save baseline.json
+$ python benchmarks/bench_local.py --compare baseline.json
+$ python benchmarks/bench_local.py --sizes 100,1000 --filter match
+"""
+import json
+import pathlib
+import platform
+import sys
+import timeit
+import click
+from agiocli import utils
+
+# The stand-in server lives with the tests
+sys.path.insert(0, str(pathlib.Path(__file__).parents[1]/"tests"))
+# pylint: disable=wrong-import-position,wrong-import-order
+import fake_autograder  # noqa: E402
+
+
+class ListClient:
+    """Answer every GET with the same list, like a client with no latency."""
+
+    # pylint: disable=too-few-public-methods
+
+    def __init__(self, items):
+        """Return items from every request."""
+        self.items = items
+
+    def get(self, path, **kwargs):
+        """Return a copy of the list."""
+        # pylint: disable=unused-argument
+        return list(self.items)
+
+
+def make_cases(size):
+    """Return a dictionary mapping benchmark names to functions.
+
+    Each function processes inputs of size items.
+    """
+    course = fake_autograder.SyntheticCourse(
+        num_projects=size, num_groups=size, submissions_per_group=size,
+    )
+    projects = course.projects(course.COURSE_PK)
+    groups = course.groups(course.PROJECT_PK)
+    submissions = course.submissions(1)
+    course_strings = [
+        f"eecs{100 + i % 900}fa{i % 100:02d}" for i in range(size)
+    ]
+    project_strings = [x["name"] for x in projects]
+    last_uniqname = utils.group_uniqnames(groups[-1])[0]
+    client = ListClient(submissions)
+    return {
+        "parse_course_string":
+            lambda: [utils.parse_course_string(x) for x in course_strings],
+        "parse_project_string":
+            lambda: [utils.parse_project_string(x) for x in project_strings],
+        "project_match":
+            lambda: utils.project_match(f"p{size}", projects),
+        "group_match":
+            lambda: utils.group_match(last_uniqname, groups),
+        "get_submission_list":
+            lambda: utils.get_submission_list(groups[0], client),
+        "submission_str":
+            lambda: [utils.submission_str(x) for x in submissions],
+        "group_str":
+            lambda: [utils.group_str(x) for x in groups],
+        "dict_str":
+            lambda: utils.dict_str(groups),
+    }
+
+
+def measure(func, repeat):
+    """Return the best time in seconds for one call to func."""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def time_str(seconds):
+    """Format a duration with a readable unit."""
+    for unit, scale in [("s", 1), ("ms", 1e-3), ("us", 1e-6)]:
+        if seconds >= scale:
+            return f"{seconds/scale:.3f} {unit}"
+    return f"{seconds/1e-9:.3f} ns"
+
+
+@click.command()
+@click.option("--sizes", default="100,1000,10000,100000",
+              help="Comma separated input sizes.")
+@click.option("--filter", "name_filter", default="",
+              help="Only run benchmarks whose name contains this string.")
+@click.option("--repeat", default=3, help="Timing runs per benchmark.")
+@click.option("--save", "save_path", type=click.Path(dir_okay=False),
+              help="Save results as a JSON baseline.")
+@click.option("--compare", "compare_path", type=click.Path(exists=True),
+              help="Compare results to a JSON baseline.")
+@click.option("--threshold", default=0.2,
+              help="Slowdown reported as a regression, 0.2 is 20%.")
+def main(sizes, name_filter, repeat, save_path, compare_path, threshold):
+    """Print the time per call of each benchmark at each input size.
+
+    Exit non-zero if any benchmark is slower than the baseline by more than
+    threshold.
+    """
+    # pylint: disable=too-many-arguments,too-many-locals
+    baseline = {}
+    if compare_path:
+        with open(compare_path, encoding="utf-8") as infile:
+            baseline = json.load(infile)["results"]
+
+    results = {}
+    regressions = []
+    print(f"{'benchmark':24} {'size':>7} {'time':>12} "
+          f"{'baseline':>12} {'change':>8}")
+    for size in [int(x) for x in sizes.split(",")]:
+        for name, func in make_cases(size).items():
+            if name_filter not in name:
+                continue
+            key = f"{name}/{size}"
+            results[key] = measure(func, repeat)
+            line = f"{name:24} {size:7} {time_str(results[key]):>12}"
+            if key in baseline:
+                change = results[key] / baseline[key] - 1
+                line += f" {time_str(baseline[key]):>12} {change:+8.1%}"
+                if change > threshold:
+                    line += "  REGRESSION"
+                    regressions.append(key)
+            print(line, flush=True)
+
+    if save_path:
+        with open(save_path, "w", encoding="utf-8") as outfile:
+            json.dump({
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "results": results,
+            }, outfile, indent=2)
+        print(f"Saved {len(results)} results to {save_path}")
+
+    if regressions:
+        sys.exit(f"Error: {len(regressions)} regressions: "
+                 f"{', '.join(regressions)}")
+
+
+if __name__ == "__main__":
+    main()  # pylint: disable=no-value-for-parameter
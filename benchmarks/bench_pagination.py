@@ -0,0 +1,59 @@
+"""Benchmark APIClient.get_paginated against a local stand-in server.
+
+Serve a 50-page listing with a fixed per-request latency and compare the
+end-to-end time of each pagination pipeline, including a small amount of
+work per item to simulate a consumer.
+
+$ python benchmarks/bench_pagination.py
+$ python benchmarks/bench_pagination.py --pages 50 --latency 0.05
+"""
+import pathlib
+import sys
+import time
+import click
+from agiocli import APIClient
+
+# The stand-in server lives with the tests
+sys.path.insert(0, str(pathlib.Path(__file__).parents[1]/"tests"))
+# pylint: disable=wrong-import-position,wrong-import-order
+import fake_autograder  # noqa: E402
+
+
+def consume(client, prefetch, item_cost):
+    """Iterate over the listing, return the number of items."""
+    num_items = 0
+    for _ in client.get_paginated("/api/items/", prefetch=prefetch):
+        time.sleep(item_cost)
+        num_items += 1
+    return num_items
+
+
+@click.command()
+@click.option("--pages", default=50, help="Number of pages.")
+@click.option("--page-size", default=100, help="Items per page.")
+@click.option("--latency", default=0.02, help="Seconds per request.")
+@click.option("--item-cost", default=0.0001, help="Seconds per item.")
+@click.option("--prefetch", default=4, help="Pages to fetch ahead.")
+def main(pages, page_size, latency, item_cost, prefetch):
+    """Print end-to-end time for sequential and pipelined pagination."""
+    items = list(range(pages * page_size))
+    print(f"{pages} pages x {page_size} items, {latency*1000:.0f} ms/request")
+    for name, count, depth in [
+            ("sequential", True, 0),
+            ("read-ahead", False, prefetch),
+            ("parallel", True, prefetch),
+    ]:
+        server = fake_autograder.FakeAutograderServer(latency=latency)
+        server.add_paginated("/api/items/", items, page_size, count=count)
+        server.start()
+        with APIClient("token", server.url) as client:
+            start = time.perf_counter()
+            num_items = consume(client, depth, item_cost)
+            elapsed = time.perf_counter() - start
+        server.stop()
+        assert num_items == len(items)
+        print(f"{name:12} {elapsed:8.3f} s")
+
+
+if __name__ == "__main__":
+    main()  # pylint: disable=no-value-for-parameter
@@ -1,7 +1,9 @@
 """Shared test fixtures."""
 import json
 import pytest
+import fake_autograder
 import utils
+import agiocli.utils
 
 
 @pytest.fixture(name="constants")
@@ -143,12 +145,22 @@ def constants_setup():
     }
 
 
+@pytest.fixture(autouse=True)
+def clear_memos():
+    """Forget the current user pk memoized by a previous test."""
+    agiocli.utils.CURRENT_USER_PKS.clear()
+
+
 @pytest.fixture(name="api_mock")
-def api_requests_mock(requests_mock, mocker, constants):
+def api_requests_mock(requests_mock, mocker, constants, tmp_path,
+                      monkeypatch):
     """Mock Autograder API with hardcoded responses."""
     # Don't look for an API token on the filesystem
     mocker.patch("agiocli.api_client.get_api_token")
 
+    # Start each test with an empty response cache
+    monkeypatch.setenv("AGIO_CACHE_DIR", str(tmp_path/"cache"))
+
     # User
     requests_mock.get(
         "https://autograder.io/api/users/current/",
@@ -561,3 +573,33 @@ def api_requests_mock(requests_mock, mocker, constants):
         headers={"Content-Type": "application/json"},
         text=config_text,
     )
+
+
+@pytest.fixture(name="live_server")
+def live_server_setup(constants):
+    """Start a local autograder.io stand-in listening on a real socket.
+
+    The server is preloaded with the routes needed to resolve a submission
+    from course, project and group shorthands.  Tests may add more routes.
+    """
+    server = fake_autograder.FakeAutograderServer({
+        "/api/users/current/": {
+            "pk": 5,
+            "username": "awdeorio@umich.edu",
+            "first_name": "Andrew",
+            "last_name": "DeOrio",
+            "email": "",
+            "is_superuser": False
+        },
+        "/api/users/5/courses_is_admin_for/": [constants["COURSE_109"]],
+        "/api/users/5/courses_is_staff_for/": [],
+        "/api/courses/109/projects/": [constants["PROJECT_1005"]],
+        "/api/projects/1005/groups/": [constants["GROUP_246965"]],
+        "/api/groups/246965/submissions/": [
+            constants["SUBMISSION_1128572"],
+            constants["SUBMISSION_1125717"],
+        ],
+    })
+    server.start()
+    yield server
+    server.stop()
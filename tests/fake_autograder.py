@@ -0,0 +1,476 @@
+"""Local autograder.io stand-in server.
+
+Unlike the requests-mock fixtures in conftest.py, this server listens on a
+real socket, so tests can observe connection reuse and concurrency.
+
+The server answers from a route table of canned responses, and optionally
+from a SyntheticCourse that generates a large course on demand.  Run it as
+a script to benchmark agio end to end.
+
+$ python tests/fake_autograder.py --port 8000 --groups 10000 --latency 0.02
+"""
+import datetime as dt
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+import click
+
+
+class FakeAutograderHandler(BaseHTTPRequestHandler):
+    """Serve canned JSON responses from the server's route table."""
+
+    # Keep-alive requires HTTP/1.1 and a Content-Length on every response
+    protocol_version = "HTTP/1.1"
+
+    # Headers and body are written separately, avoid delayed ACK stalls
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        """Count each new TCP connection."""
+        super().setup()
+        with self.server.lock:
+            self.server.num_connections += 1
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Respond with the JSON body registered for the request path."""
+        with self.server.lock:
+            self.server.num_requests += 1
+            self.server.num_in_flight += 1
+            self.server.max_in_flight = max(
+                self.server.max_in_flight, self.server.num_in_flight
+            )
+        try:
+            time.sleep(self.server.latency)
+            if self.server.inject_error():
+                self.send_json(
+                    {"detail": "Injected error."},
+                    status=self.server.error_status,
+                )
+                return
+            body = self.server.lookup(self.path)
+            if body is None:
+                self.send_json({"detail": "Not found."}, status=404)
+            elif isinstance(body, bytes):
+                self.send_bytes(body)
+            else:
+                self.send_json(body)
+        finally:
+            with self.server.lock:
+                self.server.num_in_flight -= 1
+
+    def send_json(self, obj, status=200):
+        """Send obj as a JSON response."""
+        body = json.dumps(obj).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_bytes(self, body):
+        """Send body as an application/octet-stream response."""
+        self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        """Silence per-request logging."""
+
+
+class FakeAutograderServer(ThreadingHTTPServer):
+    """Threaded HTTP server with a route table and connection counters.
+
+    routes maps a request path, including any query string, to the object
+    returned as JSON, or to bytes returned as a file download.  Paths missing
+    from routes are looked up in course, an optional SyntheticCourse.
+
+    Each response is delayed by latency seconds.  A random error_rate
+    fraction of requests fail with error_status, using a generator seeded
+    with seed.
+    """
+
+    # pylint: disable=too-many-instance-attributes
+
+    daemon_threads = True
+
+    def __init__(self, routes=None, latency=0, course=None, error_rate=0,
+                 error_status=503, port=0, seed=0):
+        """Bind to port on localhost, by default a free one."""
+        # pylint: disable=too-many-arguments
+        super().__init__(("127.0.0.1", port), FakeAutograderHandler)
+        self.routes = routes if routes is not None else {}
+        self.latency = latency
+        self.course = course
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.num_connections = 0
+        self.num_requests = 0
+        self.num_in_flight = 0
+        self.max_in_flight = 0
+        self.num_errors = 0
+        self.thread = threading.Thread(
+            target=self.serve_forever,
+            kwargs={"poll_interval": 0.01},
+            daemon=True,
+        )
+
+    def lookup(self, path):
+        """Return the response body for path, or None if there is none."""
+        if path in self.routes:
+            return self.routes[path]
+        if self.course is not None:
+            return self.course.lookup(path)
+        return None
+
+    def inject_error(self):
+        """Return True if this request should fail."""
+        with self.lock:
+            if self.error_rate and self.random.random() < self.error_rate:
+                self.num_errors += 1
+                return True
+        return False
+
+    def add_paginated(self, path, items, page_size, count=True):
+        """Serve items from path as pages of page_size, linked by next URLs.
+
+        Pages are numbered from 1 with a 'page' query parameter.  With
+        count=False, omit the total count from each page.
+        """
+        num_pages = max(1, -(-len(items) // page_size))
+        for num in range(1, num_pages + 1):
+            page = {
+                "next": None,
+                "previous": None,
+                "results": items[(num - 1)*page_size:num*page_size],
+            }
+            if num < num_pages:
+                page["next"] = f"{self.url}{path.lstrip('/')}?page={num + 1}"
+            if count:
+                page["count"] = len(items)
+            self.routes[path if num == 1 else f"{path}?page={num}"] = page
+
+    @property
+    def url(self):
+        """Return the base URL of the server."""
+        host, port = self.server_address
+        return f"http://{host}:{port}/"
+
+    def start(self):
+        """Serve requests in a background thread."""
+        self.thread.start()
+
+    def stop(self):
+        """Shut down the server and wait for it to exit."""
+        self.shutdown()
+        self.server_close()
+        self.thread.join()
+
+
+class SyntheticCourse:
+    """Generate a large course on demand, without storing every object.
+
+    The current user is an admin of one course, always in a future
+    semester, with num_projects projects.  Each project has num_groups
+    groups of group_size students, and each group has
+    submissions_per_group submissions of one file_size byte file.
+
+    Primary keys encode an object's position, so any object can be built
+    from its primary key alone.  Large listings are built on first request
+    and kept.
+
+    """
+
+    # pylint: disable=too-many-instance-attributes
+
+    USER_PK = 1
+    COURSE_PK = 1
+    PROJECT_PK = 1001
+    FILENAME = "submit.tar.gz"
+
+    def __init__(self, num_projects=1, num_groups=10000, group_size=2,
+                 submissions_per_group=50, file_size=1024):
+        """Describe the course, but don't generate anything yet."""
+        # pylint: disable=too-many-arguments
+        self.num_projects = num_projects
+        self.num_groups = num_groups
+        self.group_size = group_size
+        self.submissions_per_group = submissions_per_group
+        self.file_size = file_size
+        self.year = dt.date.today().year + 1
+        self.listings = {}
+        self.lock = threading.Lock()
+        self.routes = [
+            (r"^/api/users/current/$", self.user),
+            (r"^/api/users/(\d+)/courses_is_admin_for/$", self.admin_courses),
+            (r"^/api/users/(\d+)/courses_is_staff_for/$", self.staff_courses),
+            (r"^/api/courses/(\d+)/$", self.course),
+            (r"^/api/courses/(\d+)/projects/$", self.projects),
+            (r"^/api/projects/(\d+)/$", self.project),
+            (r"^/api/projects/(\d+)/ag_test_suites/$", self.ag_test_suites),
+            (r"^/api/projects/(\d+)/groups/$", self.groups),
+            (r"^/api/groups/(\d+)/$", self.group),
+            (r"^/api/groups/(\d+)/submissions/$", self.submissions),
+            (r"^/api/groups/(\d+)/ultimate_submission/$",
+             self.ultimate_submission),
+            (r"^/api/submissions/(\d+)/$", self.submission),
+            (r"^/api/submissions/(\d+)/file/$", self.submission_file),
+        ]
+
+    @property
+    def num_submissions(self):
+        """Return the total number of submissions in all projects."""
+        return (
+            self.num_projects * self.num_groups * self.submissions_per_group
+        )
+
+    def lookup(self, path):
+        """Return the response body for path, or None if there is none."""
+        url = urlsplit(path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        for pattern, func in self.routes:
+            match = re.search(pattern, url.path)
+            if match:
+                return func(*(int(x) for x in match.groups()), **query)
+        return None
+
+    def listing(self, key, func):
+        """Return the listing for key, building it with func on first use."""
+        with self.lock:
+            if key not in self.listings:
+                self.listings[key] = func()
+            return self.listings[key]
+
+    def user(self, pk=USER_PK):
+        """Return the user with pk."""
+        return {
+            "pk": pk,
+            "username": "admin@umich.edu",
+            "first_name": "Ada",
+            "last_name": "Admin",
+            "email": "",
+            "is_superuser": False,
+        }
+
+    def student(self, num):
+        """Return the user for student number num."""
+        return {
+            "pk": self.USER_PK + 1 + num,
+            "username": f"s{num:06d}@umich.edu",
+            "first_name": "Student",
+            "last_name": f"{num:06d}",
+            "email": "",
+            "is_superuser": False,
+        }
+
+    def admin_courses(self, user_pk):
+        """Return the courses user_pk is an admin for."""
+        if user_pk != self.USER_PK:
+            return []
+        return [self.course(self.COURSE_PK)]
+
+    def staff_courses(self, user_pk):
+        """Return the courses user_pk is staff for."""
+        # pylint: disable=unused-argument
+        return []
+
+    def course(self, pk):
+        """Return the course with pk, or None."""
+        if pk != self.COURSE_PK:
+            return None
+        return {
+            "pk": pk,
+            "name": "EECS 999",
+            "semester": "Fall",
+            "year": self.year,
+            "subtitle": "Synthetic Systems",
+            "num_late_days": 0,
+            "allowed_guest_domain": "@umich.edu",
+            "last_modified": "2021-04-07T02:19:22.818992Z",
+        }
+
+    def projects(self, course_pk):
+        """Return the projects in course_pk, or None."""
+        if course_pk != self.COURSE_PK:
+            return None
+        return [
+            self.project(self.PROJECT_PK + i) for i in range(self.num_projects)
+        ]
+
+    def project(self, pk):
+        """Return the project with pk, or None."""
+        num = pk - self.PROJECT_PK
+        if not 0 <= num < self.num_projects:
+            return None
+        return {
+            "pk": pk,
+            "name": f"Project {num + 1} - Synthetic Project",
+            "last_modified": "2021-05-13T19:46:38.254102Z",
+            "course": self.COURSE_PK,
+            "visible_to_students": True,
+            "closing_time": f"{self.year}-05-12T04:30:00Z",
+            "min_group_size": 1,
+            "max_group_size": self.group_size,
+            "expected_student_files": [
+                {"pattern": self.FILENAME, "min_num_matches": 1},
+            ],
+        }
+
+    def ag_test_suites(self, project_pk):
+        """Return the test suite configuration for project_pk, or None."""
+        if self.project(project_pk) is None:
+            return None
+        return [
+            {
+                "pk": project_pk * 10 + i,
+                "name": f"Suite {i + 1}",
+                "project": project_pk,
+                "ag_test_cases": [
+                    {"pk": project_pk * 100 + i * 10 + j,
+                     "name": f"test_{j}"}
+                    for j in range(5)
+                ],
+            }
+            for i in range(3)
+        ]
+
+    def groups(self, project_pk):
+        """Return all groups in project_pk, or None."""
+        num = project_pk - self.PROJECT_PK
+        if not 0 <= num < self.num_projects:
+            return None
+        first_pk = num * self.num_groups + 1
+        return self.listing(("groups", project_pk), lambda: [
+            self.group(pk)
+            for pk in range(first_pk, first_pk + self.num_groups)
+        ])
+
+    def group(self, pk):
+        """Return the group with pk, or None."""
+        if not 1 <= pk <= self.num_projects * self.num_groups:
+            return None
+        project_num, group_num = divmod(pk - 1, self.num_groups)
+        members = [
+            self.student(group_num * self.group_size + i)
+            for i in range(self.group_size)
+        ]
+        return {
+            "pk": pk,
+            "project": self.PROJECT_PK + project_num,
+            "extended_due_date": None,
+            "member_names": [x["username"] for x in members],
+            "members": members,
+            "bonus_submissions_remaining": 0,
+            "late_days_used": {},
+            "num_submissions": self.submissions_per_group,
+            "num_submits_towards_limit": self.submissions_per_group,
+            "created_at": "2021-04-21T17:01:37.807261Z",
+            "last_modified": "2021-04-21T17:01:37.807025Z",
+        }
+
+    def submissions(self, group_pk):
+        """Return the submissions of group_pk, newest first, or None."""
+        if self.group(group_pk) is None:
+            return None
+        first_pk = (group_pk - 1) * self.submissions_per_group + 1
+        return [
+            self.submission(pk) for pk in reversed(
+                range(first_pk, first_pk + self.submissions_per_group)
+            )
+        ]
+
+    def ultimate_submission(self, group_pk):
+        """Return the newest submission of group_pk, or None."""
+        submissions = self.submissions(group_pk)
+        return submissions[0] if submissions else None
+
+    def submission(self, pk):
+        """Return the submission with pk, or None."""
+        if not 1 <= pk <= self.num_submissions:
+            return None
+        group_index, num = divmod(pk - 1, self.submissions_per_group)
+        submitter = self.student(
+            group_index % self.num_groups * self.group_size
+        )
+        timestamp = (
+            dt.datetime(self.year - 1, 1, 1, tzinfo=dt.timezone.utc) +
+            dt.timedelta(hours=num, seconds=group_index % 3600)
+        )
+        return {
+            "pk": pk,
+            "group": group_index + 1,
+            "timestamp": timestamp.isoformat().replace("+00:00", "Z"),
+            "submitter": submitter["username"],
+            "submitted_filenames": [self.FILENAME],
+            "discarded_files": [],
+            "missing_files": {},
+            "status": "finished_grading",
+            "is_past_daily_limit": False,
+            "is_bonus_submission": False,
+            "count_towards_total_limit": True,
+            "does_not_count_for": [],
+            "position_in_queue": 0,
+            "last_modified": timestamp.isoformat().replace("+00:00", "Z"),
+        }
+
+    def submission_file(self, pk, filename=None):
+        """Return the contents of filename in submission pk, or None."""
+        if filename != self.FILENAME or self.submission(pk) is None:
+            return None
+        header = f"submission {pk} {filename}\n".encode("utf-8")
+        return (header * (self.file_size // len(header) + 1))[:self.file_size]
+
+
+@click.command()
+@click.option("--port", default=8000, help="Port to listen on.")
+@click.option("--projects", "num_projects", default=1,
+              help="Number of projects.")
+@click.option("--groups", "num_groups", default=10000,
+              help="Number of groups per project.")
+@click.option("--group-size", default=2, help="Number of students per group.")
+@click.option("--submissions", "submissions_per_group", default=50,
+              help="Number of submissions per group.")
+@click.option("--file-size", default=1024,
+              help="Size of each submitted file in bytes.")
+@click.option("--latency", default=0.0,
+              help="Delay before each response in seconds.")
+@click.option("--error-rate", default=0.0,
+              help="Fraction of requests that fail.")
+@click.option("--error-status", default=503,
+              help="HTTP status code of failed requests.")
+def main(port, num_projects, num_groups, group_size, submissions_per_group,
+         file_size, latency, error_rate, error_status):
+    """Serve a synthetic course until interrupted."""
+    # pylint: disable=too-many-arguments
+    course = SyntheticCourse(
+        num_projects=num_projects,
+        num_groups=num_groups,
+        group_size=group_size,
+        submissions_per_group=submissions_per_group,
+        file_size=file_size,
+    )
+    server = FakeAutograderServer(
+        latency=latency, course=course, error_rate=error_rate,
+        error_status=error_status, port=port,
+    )
+    print(
+        f"Serving {num_projects} projects, {num_projects * num_groups} "
+        f"groups and {course.num_submissions} submissions at {server.url}"
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()  # pylint: disable=no-value-for-parameter
@@ -0,0 +1,362 @@
+"""Unit tests for the REST API client.
+
+These tests talk to a local stand-in server over real sockets.  The server is
+implemented in fake_autograder.py.
+"""
+import asyncio
+import threading
+import time
+import tracemalloc
+import pytest
+import requests
+import fake_autograder
+from agiocli import (
+    APIClient, AsyncAPIClient, APIError, HTTPError, ContentTypeError,
+    DecodeError, utils,
+)
+
+
+def test_connection_reuse(live_server):
+    """Verify that a full submission resolution chain reuses connections.
+
+    Resolving 'last' from course, project and group shorthands makes six
+    requests.  With a pooled keep-alive session they share two TCP
+    connections, because the two course lists are fetched concurrently.
+    Latency makes sure that the course list requests overlap.
+    """
+    live_server.latency = 0.05
+    with APIClient("token", live_server.url) as client:
+        submission = utils.get_submission_smart(
+            "last", "awdeorio", "p1", "eecs485sp21", client
+        )
+    assert submission["pk"] == 1128572
+    assert live_server.num_requests == 6
+    assert live_server.max_in_flight == 2
+    assert live_server.num_connections == 2
+
+
+def test_connection_no_keep_alive(live_server):
+    """Verify that disabling keep-alive opens one connection per request."""
+    with APIClient("token", live_server.url, keep_alive=False) as client:
+        utils.get_submission_smart(
+            "last", "awdeorio", "p1", "eecs485sp21", client
+        )
+    assert live_server.num_requests == 6
+    assert live_server.num_connections == 6
+
+
+@pytest.mark.parametrize("count", [True, False])
+@pytest.mark.parametrize("prefetch", [0, 1, 4])
+def test_get_paginated(live_server, count, prefetch):
+    """Verify that every pagination pipeline yields all items in order."""
+    live_server.add_paginated(
+        "/api/items/", list(range(95)), page_size=10, count=count
+    )
+    with APIClient("token", live_server.url) as client:
+        items = list(client.get_paginated("/api/items/", prefetch=prefetch))
+    assert items == list(range(95))
+    assert live_server.num_requests == 10
+
+
+def test_get_paginated_parallel(live_server):
+    """Verify that pages are fetched in parallel when the count is known."""
+    live_server.latency = 0.05
+    live_server.add_paginated("/api/items/", list(range(50)), page_size=5)
+    with APIClient("token", live_server.url) as client:
+        items = list(client.get_paginated("/api/items/", prefetch=4))
+    assert items == list(range(50))
+    assert live_server.max_in_flight == 4
+
+
+@pytest.mark.parametrize("count", [True, False])
+def test_get_paginated_stop_early(live_server, count):
+    """Verify that abandoning the iterator stops background fetching."""
+    live_server.add_paginated(
+        "/api/items/", list(range(1000)), page_size=10, count=count
+    )
+    with APIClient("token", live_server.url) as client:
+        items = client.get_paginated("/api/items/", prefetch=2)
+        assert next(items) == 0
+        items.close()
+    assert live_server.num_requests < 10
+
+
+def test_async_concurrency(live_server):
+    """Verify that AsyncAPIClient overlaps requests up to its concurrency."""
+    live_server.latency = 0.05
+
+    async def fetch_all():
+        async with AsyncAPIClient("token", live_server.url,
+                                  concurrency=4) as client:
+            return await asyncio.gather(*[
+                client.get("/api/groups/246965/submissions/")
+                for _ in range(20)
+            ])
+
+    results = asyncio.run(fetch_all())
+    assert len(results) == 20
+    assert all(i[0]["pk"] == 1128572 for i in results)
+    assert live_server.max_in_flight == 4
+
+
+def test_async_close(live_server):
+    """Verify that closing waits for requests without blocking the loop."""
+    live_server.latency = 0.3
+    finished = []
+
+    async def tick():
+        await asyncio.sleep(0.05)
+        finished.append("tick")
+
+    async def close_while_busy():
+        client = AsyncAPIClient("token", live_server.url)
+        request = asyncio.ensure_future(client.get("/api/users/current/"))
+        await asyncio.sleep(0.05)
+
+        async def close():
+            await client.close()
+            finished.append("close")
+        await asyncio.gather(close(), tick())
+        return await request
+
+    assert asyncio.run(close_while_busy())["pk"] == 5
+    assert finished == ["tick", "close"]
+
+
+def test_async_paginated(live_server):
+    """Verify that AsyncAPIClient.get_paginated follows next links."""
+    live_server.routes["/api/items/"] = {
+        "count": 3,
+        "next": f"{live_server.url}api/items/?page=2",
+        "results": [1, 2],
+    }
+    live_server.routes["/api/items/?page=2"] = {
+        "count": 3,
+        "next": None,
+        "results": [3],
+    }
+
+    async def fetch_all():
+        async with AsyncAPIClient("token", live_server.url) as client:
+            return [i async for i in client.get_paginated("/api/items/")]
+
+    assert asyncio.run(fetch_all()) == [1, 2, 3]
+
+
+def test_download(live_server, tmp_path):
+    """Verify that download streams a file to disk."""
+    live_server.routes["/api/file/"] = b"hello world\n" * 100000
+    target = tmp_path/"hello.txt"
+    with APIClient("token", live_server.url) as client:
+        size = client.download("/api/file/", target, chunk_size=1000)
+    assert size == 1200000
+    assert target.read_bytes() == b"hello world\n" * 100000
+    assert list(tmp_path.iterdir()) == [target]
+
+
+def test_download_memory(live_server, tmp_path):
+    """Verify that peak memory use doesn't depend on the file size."""
+    live_server.routes["/api/small/"] = bytes(4 * 1024 * 1024)
+    live_server.routes["/api/large/"] = bytes(32 * 1024 * 1024)
+    peaks = {}
+    with APIClient("token", live_server.url) as client:
+        for name in ["small", "large"]:
+            tracemalloc.start()
+            client.download(f"/api/{name}/", tmp_path/name)
+            _, peaks[name] = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+    assert (tmp_path/"large").stat().st_size == 32 * 1024 * 1024
+    assert peaks["small"] < 1024 * 1024
+    assert peaks["large"] < 1024 * 1024
+
+
+def test_download_error(live_server, tmp_path):
+    """Verify that a failed download leaves no file behind."""
+    target = tmp_path/"missing.txt"
+    with APIClient("token", live_server.url) as client:
+        with pytest.raises(SystemExit):
+            client.download("/api/missing/", target)
+    assert not list(tmp_path.iterdir())
+
+
+def test_raise_errors(requests_mock):
+    """Verify the exception type for each kind of failed request."""
+    requests_mock.get(
+        "https://autograder.io/api/missing/",
+        status_code=404, reason="Not Found",
+    )
+    requests_mock.get(
+        "https://autograder.io/api/html/",
+        headers={"Content-Type": "text/html"},
+        text="<html></html>",
+    )
+    requests_mock.get(
+        "https://autograder.io/api/bad-json/",
+        headers={"Content-Type": "application/json"},
+        text="{",
+    )
+    requests_mock.get(
+        "https://autograder.io/api/down/", exc=requests.ConnectionError
+    )
+    client = APIClient(
+        "token", "https://autograder.io/", raise_errors=True, max_retries=0
+    )
+    with pytest.raises(HTTPError) as excinfo:
+        client.get("/api/missing/")
+    assert excinfo.value.status_code == 404
+    assert str(excinfo.value) == \
+        "404 Not Found for url https://autograder.io/api/missing/"
+    with pytest.raises(ContentTypeError):
+        client.get("/api/html/")
+    with pytest.raises(DecodeError):
+        client.get("/api/bad-json/")
+    with pytest.raises(APIError) as excinfo:
+        client.get("/api/down/")
+    assert excinfo.value.response is None
+
+
+def test_exit_on_error(requests_mock):
+    """Verify that the default client exits with an error message."""
+    requests_mock.get(
+        "https://autograder.io/api/missing/",
+        status_code=404, reason="Not Found",
+    )
+    client = APIClient("token", "https://autograder.io/")
+    with pytest.raises(SystemExit) as excinfo:
+        client.get("/api/missing/")
+    assert str(excinfo.value) == (
+        "Error: 404 Not Found for url https://autograder.io/api/missing/"
+    )
+
+
+def test_synthetic_course(tmp_path):
+    """Verify a submission lookup and download from a synthetic course."""
+    course = fake_autograder.SyntheticCourse(
+        num_projects=2, num_groups=20, submissions_per_group=3,
+    )
+    server = fake_autograder.FakeAutograderServer(course=course)
+    server.start()
+    try:
+        with APIClient("token", server.url) as client:
+            submission = utils.get_submission_smart(
+                "last", "s000004", "p2", "1", client
+            )
+            client.download(
+                f"/api/submissions/{submission['pk']}/file/"
+                "?filename=submit.tar.gz",
+                tmp_path/"submit.tar.gz",
+            )
+    finally:
+        server.stop()
+
+    # Students 4 and 5 are the third group in the second project
+    assert submission["group"] == 23
+    assert submission["pk"] == 69
+    assert (tmp_path/"submit.tar.gz").stat().st_size == 1024
+
+
+def test_error_injection(mocker):
+    """Verify that injected errors are retried."""
+    mocker.patch("time.sleep")
+    course = fake_autograder.SyntheticCourse(num_groups=100)
+    server = fake_autograder.FakeAutograderServer(
+        course=course, error_rate=0.5
+    )
+    server.start()
+    try:
+        with APIClient("token", server.url) as client:
+            groups = client.get("/api/projects/1001/groups/")
+    finally:
+        server.stop()
+    assert len(groups) == 100
+    assert server.num_requests == server.num_errors + 1
+
+
+def test_current_course_list(live_server):
+    """Verify concurrent course lists and the memoized current user."""
+    live_server.latency = 0.05
+    live_server.routes["/api/users/5/courses_is_staff_for/"] = \
+        live_server.routes["/api/users/5/courses_is_admin_for/"]
+    with APIClient("token", live_server.url) as client:
+        courses = utils.get_current_course_list(client)
+        assert [x.pk for x in courses] == [109]
+        assert live_server.num_requests == 3
+        assert live_server.max_in_flight == 2
+
+        # The current user is not fetched again
+        utils.get_current_course_list(client)
+        assert live_server.num_requests == 5
+
+
+def test_prefetch_during_pick(live_server, mocker):
+    """Verify that the next list is fetched while the user picks."""
+    live_server.latency = 0.05
+    num_requests = []
+
+    def pick(options, **kwargs):
+        """Take longer to choose than the server takes to respond."""
+        # pylint: disable=unused-argument
+        time.sleep(0.3)
+        num_requests.append(live_server.num_requests)
+        return options[0], 0
+
+    mocker.patch("pick.pick", side_effect=pick)
+    with APIClient("token", live_server.url) as client:
+        group = utils.get_group_smart("awdeorio", None, None, client)
+    assert group["pk"] == 246965
+
+    # Projects are fetched during the course menu, groups during the project
+    # menu, and neither is fetched again
+    assert num_requests == [4, 5]
+    assert live_server.num_requests == 5
+
+
+def test_prefetch_failure(live_server, mocker):
+    """Verify that a failed prefetch is fetched again after the pick."""
+    projects = live_server.routes.pop("/api/courses/109/projects/")
+
+    def pick(options, **kwargs):
+        """Restore the projects after the prefetch fails."""
+        # pylint: disable=unused-argument
+        time.sleep(0.3)
+        live_server.routes["/api/courses/109/projects/"] = projects
+        return options[0], 0
+
+    mocker.patch("pick.pick", side_effect=pick)
+    with APIClient("token", live_server.url) as client:
+        project = utils.get_project_smart("p1", None, client)
+    assert project["pk"] == 1005
+    assert live_server.num_requests == 5
+
+
+def test_prefetch_abandoned():
+    """Verify that abandoned prefetches don't hold up exit.
+
+    Fetches still running for the objects the user didn't pick are left on
+    daemon threads, and the ones that haven't started are cancelled.
+    """
+    release = threading.Event()
+    fetched = []
+
+    @utils.prefetched
+    def slow_list(obj, client):
+        """Block until released."""
+        # pylint: disable=unused-argument
+        release.wait()
+        fetched.append(obj["pk"])
+        return [obj["pk"]]
+
+    objs = [{"pk": 1}, {"pk": 2}, {"pk": 3}, {"pk": 4}]
+    with utils.Prefetch(slow_list, objs, None) as menu:
+        menu.keep(objs[0])
+    workers = [
+        thread for thread in threading.enumerate()
+        if thread.name == "agio-prefetch"
+    ]
+    assert workers and all(thread.daemon for thread in workers)
+
+    release.set()
+    assert slow_list(objs[0], None) == [1]
+    for thread in workers:
+        thread.join()
+    assert sorted(fetched) == [1, 2]
@@ -0,0 +1,305 @@
+"""Tests for the local response cache and the cache subcommand.
+
+These tests use the Click testing interface.
+https://click.palletsprojects.com/en/8.0.x/testing/
+"""
+import datetime as dt
+import json
+import click
+import click.testing
+import freezegun
+import fake_autograder
+from agiocli import APIClient, utils
+from agiocli.__main__ import main
+from agiocli.cache import Cache
+
+
+# Unused arguments due to fixtures are endemic to pytest
+# pylint: disable=unused-argument
+
+
+def test_cache_repeat(api_mock, requests_mock):
+    """Verify that a repeated lookup is answered from the cache.
+
+    $ agio groups awdeorio --course eecs485sp21 --project p1
+    $ agio groups awdeorio --course eecs485sp21 --project p1
+
+    api_mock is a shared test fixture that mocks responses to REST API
+    requests.  It is implemented in conftest.py.
+
+    """
+    args = ["groups", "awdeorio", "-c", "eecs485sp21", "-p", "p1"]
+    runner = click.testing.CliRunner()
+    result = runner.invoke(main, args, catch_exceptions=False)
+    assert result.exit_code == 0, result.output
+    assert requests_mock.call_count == 5
+
+    # Second run makes no requests
+    result = runner.invoke(main, args, catch_exceptions=False)
+    assert result.exit_code == 0, result.output
+    assert requests_mock.call_count == 5
+
+
+def test_cache_expired(api_mock, requests_mock):
+    """Verify that expired responses are fetched again."""
+    runner = click.testing.CliRunner()
+    with freezegun.freeze_time("2021-06-01 12:00:00"):
+        runner.invoke(main, ["courses", "109"], catch_exceptions=False)
+    with freezegun.freeze_time("2021-06-01 12:30:00"):
+        runner.invoke(main, ["courses", "109"], catch_exceptions=False)
+    assert requests_mock.call_count == 1
+    with freezegun.freeze_time("2021-06-01 13:30:00"):
+        runner.invoke(main, ["courses", "109"], catch_exceptions=False)
+    assert requests_mock.call_count == 2
+
+
+def test_cache_no_cache(api_mock, requests_mock):
+    """Verify that --no-cache always makes requests.
+
+    $ agio --no-cache courses 109
+    """
+    runner = click.testing.CliRunner()
+    for _ in range(2):
+        result = runner.invoke(
+            main, ["--no-cache", "courses", "109"], catch_exceptions=False
+        )
+        assert result.exit_code == 0, result.output
+    assert requests_mock.call_count == 2
+    assert Cache.make_default().stats()["entries"] == 0
+
+
+def test_cache_refresh(api_mock, requests_mock):
+    """Verify that --refresh makes requests and updates the cache.
+
+    $ agio --refresh courses 109
+    """
+    runner = click.testing.CliRunner()
+    runner.invoke(main, ["courses", "109"], catch_exceptions=False)
+    runner.invoke(main, ["--refresh", "courses", "109"],
+                  catch_exceptions=False)
+    assert requests_mock.call_count == 2
+    runner.invoke(main, ["courses", "109"], catch_exceptions=False)
+    assert requests_mock.call_count == 2
+
+
+def test_cache_uncacheable(api_mock, requests_mock):
+    """Verify that responses from unlisted routes are never cached."""
+    runner = click.testing.CliRunner()
+    for _ in range(2):
+        runner.invoke(main, ["projects", "1005", "--config"],
+                      catch_exceptions=False)
+
+    # Project detail is cached, test suite config is fetched both times
+    assert requests_mock.call_count == 3
+
+
+def test_cache_stats_clear(api_mock):
+    """Verify cache stats and cache clear subcommands.
+
+    $ agio cache stats
+    $ agio cache clear
+    """
+    runner = click.testing.CliRunner()
+    runner.invoke(main, ["courses", "--list"], catch_exceptions=False)
+
+    result = runner.invoke(main, ["cache", "stats"], catch_exceptions=False)
+    assert result.exit_code == 0, result.output
+    assert "Entries: 3 (3 fresh, 0 stale)" in result.output
+
+    result = runner.invoke(main, ["cache", "clear"], catch_exceptions=False)
+    assert result.exit_code == 0, result.output
+    assert "Deleted 3 cached responses" in result.output
+
+    result = runner.invoke(main, ["cache", "stats"], catch_exceptions=False)
+    assert "Entries: 0 (0 fresh, 0 stale)" in result.output
+
+
+def test_cache_revalidate(api_mock, requests_mock, constants):
+    """Verify that an expired response is revalidated with its ETag.
+
+    $ agio --debug courses 109
+    """
+    def course_callback(request, context):
+        """Return 304 if the client already has the current version."""
+        context.headers["ETag"] = '"v1"'
+        if request.headers.get("If-None-Match") == '"v1"':
+            context.status_code = 304
+            return ""
+        context.headers["Content-Type"] = "application/json"
+        return json.dumps(constants["COURSE_109"])
+    requests_mock.get(
+        "https://autograder.io/api/courses/109/", text=course_callback
+    )
+
+    runner = click.testing.CliRunner()
+    with freezegun.freeze_time("2021-06-01 12:00:00"):
+        runner.invoke(main, ["courses", "109"], catch_exceptions=False)
+    assert "If-None-Match" not in requests_mock.last_request.headers
+
+    # After the entry expires, the server answers 304 and the cached body is
+    # printed
+    with freezegun.freeze_time("2021-06-01 14:00:00"):
+        result = runner.invoke(
+            main, ["--debug", "courses", "109"], catch_exceptions=False
+        )
+    assert result.exit_code == 0, result.output
+    assert requests_mock.call_count == 2
+    assert requests_mock.last_request.headers["If-None-Match"] == '"v1"'
+    assert "304 Not Modified, saved" in result.output
+    assert '"name": "EECS 485"' in result.output
+
+    # The revalidated entry is fresh again
+    with freezegun.freeze_time("2021-06-01 14:30:00"):
+        runner.invoke(main, ["courses", "109"], catch_exceptions=False)
+    assert requests_mock.call_count == 2
+
+
+def test_cache_last_modified(api_mock, requests_mock, constants):
+    """Verify that an expired response is revalidated by Last-Modified."""
+    requests_mock.get(
+        "https://autograder.io/api/courses/109/",
+        headers={
+            "Content-Type": "application/json",
+            "Last-Modified": "Wed, 07 Apr 2021 02:19:22 GMT",
+        },
+        text=json.dumps(constants["COURSE_109"]),
+    )
+    runner = click.testing.CliRunner()
+    with freezegun.freeze_time("2021-06-01 12:00:00"):
+        runner.invoke(main, ["courses", "109"], catch_exceptions=False)
+    with freezegun.freeze_time("2021-06-01 14:00:00"):
+        runner.invoke(main, ["courses", "109"], catch_exceptions=False)
+    assert requests_mock.last_request.headers["If-Modified-Since"] == \
+        "Wed, 07 Apr 2021 02:19:22 GMT"
+
+
+def test_cache_alias(api_mock, requests_mock):
+    """Verify that resolved shorthands are looked up directly by pk.
+
+    $ agio groups awdeorio --course eecs485sp21 --project p1
+    """
+    args = ["groups", "awdeorio", "-c", "eecs485sp21", "-p", "p1"]
+    runner = click.testing.CliRunner()
+    with freezegun.freeze_time("2021-06-01 12:00:00"):
+        runner.invoke(main, args, catch_exceptions=False)
+    assert requests_mock.call_count == 5
+
+    # After every response expires, the course, project and group are
+    # fetched by pk without listing courses, projects or groups
+    with freezegun.freeze_time("2021-06-01 14:00:00"):
+        result = runner.invoke(main, args, catch_exceptions=False)
+    assert result.exit_code == 0, result.output
+    assert [x.path for x in requests_mock.request_history[5:]] == [
+        "/api/courses/109/", "/api/projects/1005/", "/api/groups/246965/",
+    ]
+
+    # With --refresh, aliases are ignored.  The current user pk is memoized
+    # by this process, so only the lists are fetched.
+    with freezegun.freeze_time("2021-06-01 14:00:00"):
+        runner.invoke(main, ["--refresh"] + args, catch_exceptions=False)
+    assert requests_mock.call_count == 12
+
+
+def test_cache_alias_not_found(api_mock, requests_mock):
+    """Verify that an alias to a deleted object is resolved again."""
+    args = ["projects", "p1", "-c", "eecs485sp21"]
+    runner = click.testing.CliRunner()
+    with freezegun.freeze_time("2021-06-01 12:00:00"):
+        runner.invoke(main, args, catch_exceptions=False)
+    requests_mock.get(
+        "https://autograder.io/api/projects/1005/",
+        status_code=404, reason="Not Found",
+    )
+    with freezegun.freeze_time("2021-06-01 14:00:00"):
+        result = runner.invoke(main, args, catch_exceptions=False)
+    assert result.exit_code == 0, result.output
+    assert json.loads(result.output)["pk"] == 1005
+    assert [x.path for x in requests_mock.request_history[4:]] == [
+        "/api/courses/109/", "/api/projects/1005/",
+        "/api/courses/109/projects/",
+    ]
+
+
+def test_cache_warm(api_mock, requests_mock):
+    """Verify that lookups after cache warm make no requests.
+
+    $ agio cache warm --course eecs485sp21 --project p1 --submissions
+    """
+    requests_mock.get(
+        "https://autograder.io/api/groups/243636/submissions/",
+        headers={"Content-Type": "application/json"},
+        text="[]",
+    )
+    runner = click.testing.CliRunner()
+    result = runner.invoke(main, [
+        "cache", "warm", "-c", "eecs485sp21", "-p", "p1", "--submissions",
+    ], catch_exceptions=False)
+    assert result.exit_code == 0, result.output
+    assert "Cached 2 groups of [1005]" in result.output
+    assert "Cached 2 submissions of [246965] awdeorio" in result.output
+    assert "[2/2]" in result.output
+    assert "Cached 6 objects for 4 hours" in result.output
+    assert requests_mock.call_count == 7
+
+    result = runner.invoke(main, [
+        "submissions", "-c", "eecs485sp21", "-p", "p1", "-g", "awdeorio",
+        "last",
+    ], catch_exceptions=False)
+    assert result.exit_code == 0, result.output
+    assert requests_mock.call_count == 7
+
+
+def test_cache_warm_course(tmp_path):
+    """Verify that warming a whole course keeps lists for hours."""
+    server = fake_autograder.FakeAutograderServer(
+        course=fake_autograder.SyntheticCourse(
+            num_projects=2, num_groups=10, submissions_per_group=2,
+        ),
+        latency=0.02,
+    )
+    server.start()
+    cache = Cache(tmp_path/"cache.sqlite3")
+    client = APIClient("token", server.url, cache=cache)
+    utils.warm_cache({"pk": 1}, client, submissions=True, jobs=4)
+    assert server.num_requests == 1 + 2 + 20
+    assert server.max_in_flight == 4
+
+    # Warmed submission lists outlive the usual one minute time to live
+    later = dt.datetime.now(dt.timezone.utc) + dt.timedelta(hours=3)
+    with freezegun.freeze_time(later):
+        group = client.get("/api/projects/1001/groups/")[0]
+        assert utils.get_submission_list(group, client)
+    assert server.num_requests == 23
+
+    # Warming again fetches everything fresh
+    utils.warm_cache({"pk": 1}, client, submissions=True, jobs=4)
+    assert server.num_requests == 46
+    server.stop()
+
+
+def test_cache_warm_hours(api_mock):
+    """Verify that warming for zero hours is an error.
+
+    $ agio cache warm --course eecs485sp21 --hours 0
+    """
+    runner = click.testing.CliRunner()
+    result = runner.invoke(main, [
+        "cache", "warm", "-c", "eecs485sp21", "--hours", "0",
+    ])
+    assert result.exit_code == 2
+    assert "Invalid value for '--hours'" in result.output
+
+
+def test_cache_alias_not_found_default_client(live_server, tmp_path):
+    """Verify that a stale alias is deleted by a client that doesn't raise."""
+    cache = Cache(tmp_path/"cache.sqlite3")
+    client = APIClient("token", live_server.url, cache=cache)
+    project = utils.get_project_smart("p1", "eecs485sp21", client)
+    assert cache.stats()["aliases"] == 2
+
+    # Forget the cached course and project.  The stand-in server has no
+    # detail routes, so direct lookups by pk return 404.
+    with cache.connection:
+        cache.connection.execute("DELETE FROM responses")
+    assert utils.get_project_smart("p1", "eecs485sp21", client) == project
+    assert cache.stats()["aliases"] == 2
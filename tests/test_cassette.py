@@ -0,0 +1,61 @@
+"""Tests for recording and replaying responses with AGIO_RECORD/REPLAY."""
+import time
+import pytest
+from agiocli import APIClient, APIError, utils
+
+
+def test_record_replay(live_server, tmp_path, monkeypatch):
+    """Verify that a recorded chain is replayed without a server."""
+    live_server.routes["/api/file/"] = b"\x00\x01binary\n" * 1000
+    cassette_dir = tmp_path/"cassette"
+
+    # Record a submission resolution chain and a file download
+    monkeypatch.setenv("AGIO_RECORD", str(cassette_dir))
+    with APIClient("secret-token", live_server.url) as client:
+        recorded = utils.get_submission_smart(
+            "last", "awdeorio", "p1", "eecs485sp21", client
+        )
+        client.download("/api/file/", tmp_path/"recorded.bin")
+    assert live_server.num_requests == 7
+    live_server.stop()
+
+    # Each body is saved to its own file, the token is never saved
+    assert len(list((cassette_dir/"bodies").iterdir())) == 7
+    assert "secret-token" not in \
+        (cassette_dir/"cassette.jsonl").read_text(encoding="utf-8")
+
+    # Replay the same requests with no server
+    monkeypatch.delenv("AGIO_RECORD")
+    monkeypatch.setenv("AGIO_REPLAY", str(cassette_dir))
+    with APIClient("secret-token", live_server.url) as client:
+        replayed = utils.get_submission_smart(
+            "last", "awdeorio", "p1", "eecs485sp21", client
+        )
+        client.download("/api/file/", tmp_path/"replayed.bin")
+    assert replayed == recorded
+    assert (tmp_path/"replayed.bin").read_bytes() == \
+        (tmp_path/"recorded.bin").read_bytes()
+
+
+def test_replay_miss(live_server, tmp_path, monkeypatch):
+    """Verify that a request missing from the cassette is an error."""
+    monkeypatch.setenv("AGIO_RECORD", str(tmp_path))
+    APIClient("token", live_server.url).get("/api/users/current/")
+    monkeypatch.delenv("AGIO_RECORD")
+    monkeypatch.setenv("AGIO_REPLAY", str(tmp_path))
+    client = APIClient("token", live_server.url, raise_errors=True)
+    with pytest.raises(APIError, match="No recorded response"):
+        client.get("/api/courses/109/")
+
+
+def test_replay_latency(live_server, tmp_path, monkeypatch):
+    """Verify that AGIO_REPLAY_LATENCY delays replayed responses."""
+    monkeypatch.setenv("AGIO_RECORD", str(tmp_path))
+    APIClient("token", live_server.url).get("/api/users/current/")
+    monkeypatch.delenv("AGIO_RECORD")
+    monkeypatch.setenv("AGIO_REPLAY", str(tmp_path))
+    monkeypatch.setenv("AGIO_REPLAY_LATENCY", "0.1")
+    client = APIClient("token", live_server.url)
+    start = time.monotonic()
+    assert client.get("/api/users/current/")["pk"] == 5
+    assert time.monotonic() - start >= 0.1
@@ -4,14 +4,49 @@ System tests for the command line interface.
 These tests use the Click testing interface.
 https://click.palletsprojects.com/en/8.0.x/testing/
 """
+import subprocess
+import sys
 import click
 import click.testing
 from agiocli.__main__ import main
 
 
+# Modules that agio --help should never import
+DEFERRED_MODULES = [
+    "asyncio", "concurrent.futures", "dateutil", "pick", "readline",
+    "requests", "sqlite3", "webbrowser",
+]
+
+# Upper bound on the time to import the agiocli package, in microseconds
+IMPORT_BUDGET_US = 250_000
+
+
 def test_example():
     """Dummy example test."""
     runner = click.testing.CliRunner(mix_stderr=False)
     result = runner.invoke(main, ["--version"], catch_exceptions=False)
     assert result.exit_code == 0, result.output
     assert "version" in result.output
+
+
+def test_startup_imports():
+    """Verify that agio --help imports only what it needs.
+
+    $ python -X importtime -m agiocli --help
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "agiocli", "--help"],
+        capture_output=True, text=True, check=True,
+    )
+
+    # Each line looks like "import time: self | cumulative | package.module"
+    cumulative_us = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        cumulative_us[name.strip()] = int(cumulative)
+    assert "agiocli" in cumulative_us
+    for name in DEFERRED_MODULES:
+        assert name not in cumulative_us
+    assert cumulative_us["agiocli"] < IMPORT_BUDGET_US
@@ -143,3 +143,21 @@ def test_courses_default_semester(api_mock):
     assert result.exit_code == 0, result.output
     output_obj = json.loads(result.output)
     assert output_obj["pk"] == 109
+
+
+def test_courses_not_found(api_mock, requests_mock):
+    """Verify that an API error becomes an exit message.
+
+    $ agio courses 999
+
+    api_mock is a shared test fixture that mocks responses to REST API
+    requests.  It is implemented in conftest.py.
+
+    """
+    requests_mock.get("https://autograder.io/api/courses/999/",
+                      status_code=404, reason="Not Found")
+    runner = click.testing.CliRunner()
+    result = runner.invoke(main, ["courses", "999"])
+    assert result.exit_code == 1
+    assert "Error: 404 Not Found for url " \
+        "https://autograder.io/api/courses/999/" in result.output
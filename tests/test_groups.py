@@ -142,3 +142,44 @@ def test_groups_empty(api_mock, mocker, constants):
     assert result.exit_code == 0, result.output
     output_obj = json.loads(result.output)
     assert output_obj["pk"] == 246965  # awdeorio's group
+
+
+def test_groups_lookup(api_mock):
+    """Verify agio groups lookup of a roster from stdin.
+
+    $ agio groups --lookup - --project 1005
+
+    api_mock is a shared test fixture that mocks responses to REST API
+    requests.  It is implemented in conftest.py.
+
+    """
+    runner = click.testing.CliRunner()
+    result = runner.invoke(
+        main, ["groups", "--lookup", "-", "--project", "1005"],
+        input="awdeorio\nachitta@umich.edu\n\nnobody\n",
+    )
+    assert result.exit_code == 1
+    assert "awdeorio [246965] awdeorio" in result.output
+    assert "achitta [243636] achitta" in result.output
+    assert "Error: uniqname not in any group: nobody" in result.output
+    assert "Error: 1 uniqnames not in any group, 0 in more than one group" \
+        in result.output
+
+
+def test_groups_empty_pk(api_mock, mocker, constants):
+    """Verify that the uniqname prompt accepts a group pk.
+
+    $ agio groups --project 1005
+
+    api_mock is a shared test fixture that mocks responses to REST API
+    requests.  It is implemented in conftest.py.
+
+    """
+    mocker.patch("builtins.input", return_value="243636")
+    runner = click.testing.CliRunner()
+    result = runner.invoke(
+        main, ["groups", "--project", "1005"], catch_exceptions=False
+    )
+    assert result.exit_code == 0, result.output
+    output_obj = json.loads(result.output)
+    assert output_obj["pk"] == 243636
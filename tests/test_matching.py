@@ -356,3 +356,55 @@ PROJECTS_INCLUDING_INVALID = [
     {"pk": 1749, "name": "Testing JVM errors 20.04"},
     {"pk": 1748, "name": "Testing JVM errors 22.04"},
 ]
+
+
+def test_project_index():
+    """Verify that an index parses each name once and matches many terms."""
+    utils.parse_project_name.cache_clear()
+    index = utils.ProjectIndex(PROJECTS_INCLUDING_INVALID)
+    expected_pks = {
+        "p1": [1527],
+        "p2": [1525],
+        "Project 3": [1524],
+        "search": [1523],
+        "lab": [],
+        "images": [],
+        "P9": [],
+    }
+    for search, pks in expected_pks.items():
+        assert [x["pk"] for x in index.match(search)] == pks
+    names = {x["name"] for x in PROJECTS_INCLUDING_INVALID}
+    assert utils.parse_project_name.cache_info().misses == len(names)
+
+
+def test_group_index():
+    """Verify batch lookup of missing and duplicate group memberships."""
+    groups = [
+        {"pk": 1, "members": [{"username": "alice@umich.edu"}]},
+        {"pk": 2, "members": [
+            {"username": "bob@umich.edu"}, {"username": "carol@umich.edu"},
+        ]},
+        {"pk": 3, "members": [{"username": "bob@umich.edu"}]},
+    ]
+    index = utils.GroupIndex(groups)
+    assert index.match("carol") == [groups[1]]
+    assert utils.group_match("bob", groups) == [groups[1], groups[2]]
+    found, missing, duplicates = index.lookup(
+        ["alice\n", "carol@umich.edu", "bob", "dave"]
+    )
+    assert found == {"alice": groups[0], "carol": groups[1]}
+    assert list(missing) == ["dave"]
+    assert duplicates == {"bob": [groups[1], groups[2]]}
+
+
+def test_prefix_completer():
+    """Verify readline completion by prefix."""
+    completer = utils.PrefixCompleter(
+        ["awdeorio", "achitta", "jklooste", "awdeorio", "246965", "243636"]
+    )
+    assert completer.complete("a") == ["achitta", "awdeorio"]
+    assert completer.complete("24") == ["243636", "246965"]
+    assert completer.complete("z") == []
+    assert completer.complete("") == completer.words
+    assert [completer("a", i) for i in range(3)] == \
+        ["achitta", "awdeorio", None]
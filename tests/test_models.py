@@ -0,0 +1,70 @@
+"""Unit tests for API record models."""
+import datetime as dt
+import json
+import tracemalloc
+import pytest
+import fake_autograder
+from agiocli import models, utils
+
+
+def test_parse_timestamp():
+    """Verify the fromisoformat fast path and the dateutil fallback."""
+    expected = dt.datetime(
+        2021, 6, 29, 14, 55, 57, 886137, tzinfo=dt.timezone.utc
+    )
+    assert models.parse_timestamp("2021-06-29T14:55:57.886137Z") == expected
+    assert models.parse_timestamp("2021-06-29T14:55:57.886137+00:00") == \
+        expected
+    assert models.parse_timestamp("Tue, 29 Jun 2021 14:55:57 UTC") == \
+        expected.replace(microsecond=0)
+
+
+def test_record_mapping(constants):
+    """Verify that a record behaves like the dict it wraps."""
+    group = models.Group(constants["GROUP_246965"])
+    assert group.pk == 246965
+    assert group["project"] == 1005
+    assert group.get("missing") is None
+    assert "members" in group
+    assert group == constants["GROUP_246965"]
+    assert group == models.Group(constants["GROUP_246965"])
+    assert group.uniqnames == ["awdeorio"]
+    assert utils.group_uniqnames(group) == ["awdeorio"]
+    assert json.loads(utils.dict_str(group)) == constants["GROUP_246965"]
+    with pytest.raises(TypeError):
+        hash(group)
+
+
+def test_submission_record(constants):
+    """Verify that a submission timestamp is parsed once."""
+    submission = models.Submission(constants["SUBMISSION_1128572"])
+    assert submission.submitted_at.year == 2021
+    assert submission["timestamp"] == "2021-06-29T14:55:57.886137Z"
+    assert utils.submission_key(submission) is submission.submitted_at
+    assert utils.submission_str(submission) == \
+        utils.submission_str(constants["SUBMISSION_1128572"])
+
+
+def test_record_memory():
+    """Verify that submission records take less memory than the raw dicts."""
+    course = fake_autograder.SyntheticCourse(
+        num_groups=2000, submissions_per_group=50
+    )
+    text = json.dumps([
+        course.submission(pk) for pk in range(1, course.num_submissions + 1)
+    ])
+
+    tracemalloc.start()
+    submissions = json.loads(text)
+    raw, _ = tracemalloc.get_traced_memory()
+    del submissions
+    tracemalloc.stop()
+
+    tracemalloc.start()
+    submissions = [models.Submission(x) for x in json.loads(text)]
+    records, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert len(submissions) == 100000
+    assert submissions[0] == course.submission(1)
+    assert records < 0.85 * raw
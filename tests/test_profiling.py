@@ -0,0 +1,55 @@
+"""Tests for --profile, which profiles a subcommand.
+
+These tests use the Click testing interface.
+https://click.palletsprojects.com/en/8.0.x/testing/
+"""
+import pstats
+import click
+import click.testing
+from agiocli.__main__ import main
+
+
+# Unused arguments due to fixtures are endemic to pytest
+# pylint: disable=unused-argument
+
+
+def test_profile_cpu(api_mock, tmp_path, monkeypatch):
+    """Verify that a CPU profile is saved as pstats data.
+
+    $ agio --profile cpu courses eecs485sp21
+
+    api_mock is a shared test fixture that mocks responses to REST API
+    requests.  It is implemented in conftest.py.
+
+    """
+    monkeypatch.chdir(tmp_path)
+    runner = click.testing.CliRunner()
+    result = runner.invoke(
+        main, ["--profile", "cpu", "courses", "eecs485sp21"],
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 0, result.output
+    assert "Saved CPU profile to agio.prof" in result.output
+    stats = pstats.Stats(str(tmp_path/"agio.prof"))
+    functions = {name for _, _, name in stats.stats}
+    assert "get_course_smart" in functions
+    assert "course_match" in functions
+
+
+def test_profile_alloc(api_mock, tmp_path):
+    """Verify that an allocation report is saved.
+
+    $ agio --profile alloc --profile-output alloc.txt courses --list
+    """
+    report_path = tmp_path/"alloc.txt"
+    runner = click.testing.CliRunner()
+    result = runner.invoke(main, [
+        "--profile", "alloc", "--profile-output", str(report_path),
+        "courses", "--list",
+    ], catch_exceptions=False)
+    assert result.exit_code == 0, result.output
+    assert f"Saved allocation report to {report_path}" in result.output
+    lines = report_path.read_text(encoding="utf-8").splitlines()
+    assert lines[0].startswith("Peak traced memory: ")
+    assert len(lines) > 1
+    assert all(" B in " in x for x in lines[1:])
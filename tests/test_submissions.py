@@ -3,7 +3,9 @@
 These tests use the Click testing interface.
 https://click.palletsprojects.com/en/8.0.x/testing/
 """
+import hashlib
 import json
+import pathlib
 import click
 import click.testing
 from pick import Option
@@ -145,3 +147,218 @@ def test_submissions_empty(api_mock, mocker, constants):
     assert result.exit_code == 0, result.output
     output_obj = json.loads(result.output)
     assert output_obj["pk"] == 1128572  # awdeorio's latest submission
+
+
+def test_submissions_download(api_mock, requests_mock, tmp_path,
+                              monkeypatch):
+    """Verify submissions subcommand with download option.
+
+    $ agio submissions 1128572 --download
+
+    api_mock is a shared test fixture that mocks responses to REST API
+    requests.  It is implemented in conftest.py.
+
+    """
+    requests_mock.get(
+        "https://autograder.io/api/submissions/1128572/file/"
+        "?filename=submit.tar.gz",
+        headers={"Content-Type": "application/octet-stream"},
+        content=b"fake tarball",
+    )
+    monkeypatch.chdir(tmp_path)
+    runner = click.testing.CliRunner()
+    result = runner.invoke(
+        main, ["submissions", "1128572", "--download"],
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 0, result.output
+    assert "Saved submission-1128572-submit.tar.gz" in result.output
+    target = pathlib.Path("submission-1128572-submit.tar.gz")
+    assert target.read_bytes() == b"fake tarball"
+
+    # Refuse to clobber the existing file
+    result = runner.invoke(
+        main, ["submissions", "1128572", "--download"],
+    )
+    assert result.exit_code != 0
+    assert "refuse to clobber" in result.output
+
+
+def test_submissions_download_jobs(api_mock, requests_mock, constants,
+                                   tmp_path, monkeypatch):
+    """Verify parallel download of a submission with many files.
+
+    $ agio submissions 1128572 --download --jobs 4
+
+    api_mock is a shared test fixture that mocks responses to REST API
+    requests.  It is implemented in conftest.py.
+
+    """
+    filenames = [f"file{i}.txt" for i in range(10)]
+    submission = dict(constants["SUBMISSION_1128572"])
+    submission["submitted_filenames"] = filenames
+    requests_mock.get(
+        "https://autograder.io/api/submissions/1128572/",
+        headers={"Content-Type": "application/json"},
+        text=json.dumps(submission),
+    )
+    for filename in filenames:
+        requests_mock.get(
+            "https://autograder.io/api/submissions/1128572/file/"
+            f"?filename={filename}",
+            headers={"Content-Type": "application/octet-stream"},
+            content=filename.encode(),
+        )
+    monkeypatch.chdir(tmp_path)
+    runner = click.testing.CliRunner()
+    result = runner.invoke(
+        main, ["submissions", "1128572", "--download", "--jobs", "4"],
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 0, result.output
+    assert "Downloaded 10 files, 90 B" in result.output
+    for filename in filenames:
+        target = pathlib.Path("submission-1128572")/filename
+        assert target.read_text() == filename
+
+    # Refuse to clobber the existing directory
+    result = runner.invoke(
+        main, ["submissions", "1128572", "--download", "--jobs", "4"],
+    )
+    assert result.exit_code != 0
+    assert "refuse to clobber directory" in result.output
+
+
+def test_submissions_download_all(api_mock, requests_mock, constants,
+                                  tmp_path, monkeypatch):
+    """Verify bulk download of every group's final graded submission.
+
+    $ agio submissions --project 1005 --download-all --jobs 2
+
+    api_mock is a shared test fixture that mocks responses to REST API
+    requests.  It is implemented in conftest.py.
+
+    """
+    submission = dict(constants["SUBMISSION_1125717"])
+    submission["pk"] = 1000000
+    submission["group"] = 243636
+    requests_mock.get(
+        "https://autograder.io/api/groups/243636/ultimate_submission/",
+        headers={"Content-Type": "application/json"},
+        text=json.dumps(submission),
+    )
+    for submission_pk in [1000000, 1125717]:
+        requests_mock.get(
+            f"https://autograder.io/api/submissions/{submission_pk}/file/"
+            "?filename=submit.tar.gz",
+            headers={"Content-Type": "application/octet-stream"},
+            content=f"tarball {submission_pk}".encode(),
+        )
+    monkeypatch.chdir(tmp_path)
+    runner = click.testing.CliRunner()
+    args = ["submissions", "--project", "1005", "--download-all", "-j", "2"]
+    result = runner.invoke(main, args, catch_exceptions=False)
+    assert result.exit_code == 0, result.output
+    assert "Downloaded 2 files from 2 groups" in result.output
+    dest = pathlib.Path("project-1005-submissions")
+    assert (dest/"achitta-243636/submit.tar.gz").read_text() == \
+        "tarball 1000000"
+    assert (dest/"awdeorio-246965/submit.tar.gz").read_text() == \
+        "tarball 1125717"
+
+    # Check manifest
+    manifest_path = dest/"manifest.jsonl"
+    manifest = [json.loads(x) for x in manifest_path.read_text().splitlines()]
+    manifest = sorted(manifest, key=lambda x: x["group"])
+    assert manifest[0] == {
+        "group": 243636,
+        "submission": 1000000,
+        "file": "achitta-243636/submit.tar.gz",
+        "size": 15,
+        "sha256": hashlib.sha256(b"tarball 1000000").hexdigest(),
+    }
+    assert manifest[1]["file"] == "awdeorio-246965/submit.tar.gz"
+
+    # Simulate an interrupted run by truncating the manifest.  Rerunning
+    # downloads only the missing file.
+    manifest_path.write_text(json.dumps(manifest[0]) + "\n{")
+    result = runner.invoke(main, args, catch_exceptions=False)
+    assert result.exit_code == 0, result.output
+    assert "Downloaded 1 files from 2 groups" in result.output
+    assert "skipped 1 files" in result.output
+    assert "Saved project-1005-submissions/awdeorio-246965" in result.output
+    manifest = manifest_path.read_text().splitlines()
+    assert len(manifest) == 3
+    assert json.loads(manifest[2])["group"] == 246965
+
+
+def test_submissions_download_all_failure(api_mock, requests_mock,
+                                          tmp_path, monkeypatch):
+    """Verify that one failed group doesn't stop a bulk download.
+
+    $ agio submissions --project 1005 --download-all
+
+    api_mock is a shared test fixture that mocks responses to REST API
+    requests.  It is implemented in conftest.py.
+
+    """
+    requests_mock.get(
+        "https://autograder.io/api/groups/243636/ultimate_submission/",
+        status_code=404, reason="Not Found",
+    )
+    requests_mock.get(
+        "https://autograder.io/api/submissions/1125717/file/"
+        "?filename=submit.tar.gz",
+        headers={"Content-Type": "application/octet-stream"},
+        content=b"tarball",
+    )
+    monkeypatch.chdir(tmp_path)
+    runner = click.testing.CliRunner()
+    result = runner.invoke(
+        main, ["submissions", "--project", "1005", "--download-all"],
+    )
+    assert result.exit_code == 1
+    assert "Error: group [243636] achitta: 404 Not Found" in result.output
+    assert "Downloaded 1 files from 2 groups" in result.output
+    assert "Error: 1 groups failed, rerun to retry" in result.output
+    dest = pathlib.Path("project-1005-submissions")
+    assert (dest/"awdeorio-246965/submit.tar.gz").exists()
+
+
+def test_submissions_download_all_fresh(api_mock, requests_mock, constants,
+                                        tmp_path, monkeypatch):
+    """Verify that download-all doesn't trust a cached group list.
+
+    $ agio groups --project 1005 --list
+    $ agio submissions --project 1005 --download-all
+    """
+    def mock_groups(num_submissions):
+        """Mock a group list with one group."""
+        group = dict(constants["GROUP_246965"])
+        group["num_submissions"] = num_submissions
+        requests_mock.get(
+            "https://autograder.io/api/projects/1005/groups/",
+            headers={"Content-Type": "application/json"},
+            text=json.dumps([group]),
+        )
+
+    # Cache a group list from before the group's first submission
+    mock_groups(0)
+    runner = click.testing.CliRunner()
+    runner.invoke(main, ["groups", "-p", "1005", "-l"],
+                  catch_exceptions=False)
+
+    mock_groups(2)
+    requests_mock.get(
+        "https://autograder.io/api/submissions/1125717/file/"
+        "?filename=submit.tar.gz",
+        headers={"Content-Type": "application/octet-stream"},
+        content=b"tarball",
+    )
+    monkeypatch.chdir(tmp_path)
+    result = runner.invoke(
+        main, ["submissions", "--project", "1005", "--download-all"],
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 0, result.output
+    assert "Downloaded 1 files from 1 groups" in result.output
@@ -0,0 +1,93 @@
+"""System tests for sync subcommand.
+
+These tests use the Click testing interface.
+https://click.palletsprojects.com/en/8.0.x/testing/
+"""
+import json
+import click
+import click.testing
+from agiocli.__main__ import main
+
+
+# Unused arguments due to fixtures are endemic to pytest
+# pylint: disable=unused-argument
+
+
+def mock_files(requests_mock, submission_pks):
+    """Mock the submit.tar.gz file of each submission."""
+    for submission_pk in submission_pks:
+        requests_mock.get(
+            f"https://autograder.io/api/submissions/{submission_pk}/file/"
+            "?filename=submit.tar.gz",
+            headers={"Content-Type": "application/octet-stream"},
+            content=f"tarball {submission_pk}".encode(),
+        )
+
+
+def test_sync(api_mock, requests_mock, constants, tmp_path):
+    """Verify that sync only downloads new submissions.
+
+    $ agio sync --project 1005 DEST
+
+    api_mock is a shared test fixture that mocks responses to REST API
+    requests.  It is implemented in conftest.py.
+
+    """
+    # Group 243636 has one submission, group 246965 has two
+    submission = dict(constants["SUBMISSION_1125717"])
+    submission.update({"pk": 1000000, "group": 243636})
+    requests_mock.get(
+        "https://autograder.io/api/groups/243636/submissions/",
+        headers={"Content-Type": "application/json"},
+        text=json.dumps([submission]),
+    )
+    mock_files(requests_mock, [1000000, 1125717, 1128572])
+
+    # First sync downloads everything
+    dest = tmp_path/"backup"
+    runner = click.testing.CliRunner()
+    args = ["sync", "--project", "1005", str(dest)]
+    result = runner.invoke(main, args, catch_exceptions=False)
+    assert result.exit_code == 0, result.output
+    assert "Synced 3 new submissions (3 files" in result.output
+    group_dir = dest/"awdeorio-246965"
+    assert (group_dir/"submission-1128572/submit.tar.gz").read_text() == \
+        "tarball 1128572"
+    assert (group_dir/"submission-1125717/submit.tar.gz").exists()
+    assert (dest/"achitta-243636/submission-1000000/submit.tar.gz").exists()
+
+    # Second sync lists groups again, bypassing the cache, and makes no
+    # per-group requests.  The project detail is answered from the cache.
+    num_requests = requests_mock.call_count
+    result = runner.invoke(main, args, catch_exceptions=False)
+    assert result.exit_code == 0, result.output
+    assert "Synced 0 new submissions" in result.output
+    assert "2 groups unchanged" in result.output
+    assert requests_mock.call_count == num_requests + 1
+
+    # A new submission for group 246965 downloads just that submission
+    group = dict(constants["GROUP_246965"])
+    group["num_submissions"] = 3
+    requests_mock.get(
+        "https://autograder.io/api/projects/1005/groups/",
+        headers={"Content-Type": "application/json"},
+        text=json.dumps([group]),
+    )
+    submission = dict(constants["SUBMISSION_1128572"])
+    submission["pk"] = 1130000
+    requests_mock.get(
+        "https://autograder.io/api/groups/246965/submissions/",
+        headers={"Content-Type": "application/json"},
+        text=json.dumps([
+            submission,
+            constants["SUBMISSION_1128572"],
+            constants["SUBMISSION_1125717"],
+        ])
+    )
+    mock_files(requests_mock, [1130000])
+    result = runner.invoke(main, args, catch_exceptions=False)
+    assert result.exit_code == 0, result.output
+    assert "Synced 1 new submissions (1 files" in result.output
+    assert (group_dir/"submission-1130000/submit.tar.gz").exists()
+    state = json.loads((dest/".agio-sync.json").read_text())
+    assert state["246965"] == {"num_submissions": 3, "pk": 1130000}
@@ -0,0 +1,109 @@
+"""Tests for --trace, which saves requests and lookups as a trace file.
+
+These tests use the Click testing interface.
+https://click.palletsprojects.com/en/8.0.x/testing/
+"""
+import json
+import click
+import click.testing
+from agiocli import APIClient
+from agiocli.__main__ import main
+from agiocli.trace import Tracer
+
+
+# Unused arguments due to fixtures are endemic to pytest
+# pylint: disable=unused-argument
+
+
+def load_spans(path):
+    """Return the complete events from a Chrome trace-event file."""
+    with open(path, encoding="utf-8") as infile:
+        trace = json.load(infile)
+    return [x for x in trace["traceEvents"] if x["ph"] == "X"]
+
+
+def test_trace(api_mock, tmp_path):
+    """Verify spans for the command, lookups and requests.
+
+    $ agio --trace trace.json groups awdeorio -c eecs485sp21 -p p1
+
+    api_mock is a shared test fixture that mocks responses to REST API
+    requests.  It is implemented in conftest.py.
+
+    """
+    trace_path = tmp_path/"trace.json"
+    runner = click.testing.CliRunner()
+    result = runner.invoke(main, [
+        "--trace", str(trace_path),
+        "groups", "awdeorio", "-c", "eecs485sp21", "-p", "p1",
+    ], catch_exceptions=False)
+    assert result.exit_code == 0, result.output
+    spans = load_spans(trace_path)
+    names = [x["name"] for x in spans]
+
+    # One span for the whole command
+    command, = [x for x in spans if x["cat"] == "command"]
+    assert command["name"] == "agio groups"
+
+    # Each lookup stage, with its string arguments
+    assert {
+        "get_course_smart", "get_project_smart", "get_group_smart",
+    } <= set(names)
+    group_span, = [x for x in spans if x["name"] == "get_group_smart"]
+    assert group_span["args"]["group_arg"] == "awdeorio"
+
+    # Each request is a cache miss, answered by one HTTP response
+    requests = [x for x in spans if x["cat"] == "request"]
+    responses = [x for x in spans if x["cat"] == "http"]
+    assert len(requests) == 5
+    assert "GET /api/users/current/" in names
+    assert all(x["args"]["cache"] == "miss" for x in requests)
+    assert len(responses) == 5
+    assert all(x["args"]["status"] == 200 for x in responses)
+    assert all(x["args"]["bytes"] > 0 for x in responses)
+
+    # Spans nest inside the command span
+    for span in spans:
+        assert span["ts"] >= command["ts"]
+        assert span["ts"] + span["dur"] <= command["ts"] + command["dur"]
+
+    # A second run is answered from the cache without HTTP requests
+    runner.invoke(main, [
+        "--trace", str(trace_path),
+        "groups", "awdeorio", "-c", "eecs485sp21", "-p", "p1",
+    ], catch_exceptions=False)
+    spans = load_spans(trace_path)
+    requests = [x for x in spans if x["cat"] == "request"]
+    assert all(x["args"]["cache"] == "hit" for x in requests)
+    assert not [x for x in spans if x["cat"] == "http"]
+
+
+def test_trace_error(api_mock, requests_mock, tmp_path):
+    """Verify that the trace is saved when a request fails.
+
+    $ agio --trace trace.json courses 999
+    """
+    requests_mock.get("https://autograder.io/api/courses/999/",
+                      status_code=404, reason="Not Found")
+    trace_path = tmp_path/"trace.json"
+    runner = click.testing.CliRunner()
+    result = runner.invoke(
+        main, ["--trace", str(trace_path), "courses", "999"]
+    )
+    assert result.exit_code == 1
+    response, = [x for x in load_spans(trace_path) if x["cat"] == "http"]
+    assert response["args"]["status"] == 404
+
+
+def test_trace_download(live_server, tmp_path):
+    """Verify that a download span records the number of bytes."""
+    live_server.routes["/api/file/"] = b"x" * 1000
+    tracer = Tracer()
+    with APIClient("token", live_server.url, tracer=tracer) as client:
+        client.download("/api/file/", tmp_path/"file.bin")
+    tracer.save(tmp_path/"trace.json")
+    download, = [
+        x for x in load_spans(tmp_path/"trace.json")
+        if x["name"] == "download /api/file/"
+    ]
+    assert download["args"]["bytes"] == 1000